@@ -9,17 +9,102 @@ import numpy as np
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import DBSCAN
 from sklearn.decomposition import PCA
-import scipy.stats as stats
 from scipy import signal
 import warnings
-warnings.filterwarnings('ignore')
+from contextlib import contextmanager
+
+try:
+    # Optional GPU backend (RAPIDS cuML) for large batches
+    from cuml.ensemble import IsolationForest as GPUIsolationForest
+except ImportError:
+    GPUIsolationForest = None
+
+try:
+    # Optional JIT compiler for the per-candle kernel
+    import numba
+except ImportError:
+    numba = None
 
 logger = logging.getLogger(__name__)
 
+# Symbol workers are spawned rather than forked: the parent may already be running
+# Numba, OpenMP or scikit-learn thread pools, which are not fork-safe
+_SPAWN = multiprocessing.get_context('spawn')
+
+# Fixed-width record layout for compact, columnar export of anomalies and signals
+ANOMALY_DTYPE = np.dtype([
+    ('type', 'U24'),
+    ('subtype', 'U24'),
+    ('timestamp', 'M8[ns]'),
+    ('price', 'f8'),
+    ('severity', 'U8'),
+    ('score', 'f4')
+])
+
+# Field holding each record type's headline magnitude, exported as 'score'
+SCORE_FIELDS = {
+    'statistical_outlier': 'z_score',
+    'multivariate_anomaly': 'anomaly_score',
+    'volume_price_divergence': 'price_change',
+    'price_spike': 'deviation_factor',
+    'price_gap': 'gap_percent',
+    'pump_dump': 'pump_magnitude',
+    'wash_trading': 'volume_ratio',
+    'spoofing': 'volume_spike',
+    'coordinated_trading': 'price_volume_correlation',
+    'flash_crash': 'crash_magnitude'
+}
+
+
+@contextmanager
+def _suppress_runtime():
+    """Silence numeric RuntimeWarnings (division by zero, NaN comparisons) within a block"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        yield
+
+
+def _classify_candles(open_price, high_price, low_price, close_price):
+    """
+    Classify candles in a single pass: 0 = none, 1 = doji, 2 = hammer/hanging man.
+    Returns the codes with the body ratio (doji) or lower wick ratio (hammer).
+    """
+    n = close_price.shape[0]
+    codes = np.zeros(n, dtype=np.int8)
+    ratios = np.full(n, np.nan)
+    
+    for i in range(n):
+        o, h, l, c = open_price[i], high_price[i], low_price[i], close_price[i]
+        if np.isnan(o) or np.isnan(h) or np.isnan(l) or np.isnan(c):
+            continue
+        
+        top = o if o > c else c
+        bottom = o if o < c else c
+        body_size = top - bottom
+        upper_wick = h - top
+        lower_wick = bottom - l
+        total_range = h - l
+        
+        if total_range > 0 and body_size / total_range < 0.1:
+            codes[i] = 1
+            ratios[i] = body_size / total_range
+        elif lower_wick > 2 * body_size and upper_wick < body_size:
+            codes[i] = 2
+            ratios[i] = lower_wick / body_size
+    
+    return codes, ratios
+
+
+if numba is not None:
+    _classify_candles = numba.njit(cache=True, error_model='numpy')(_classify_candles)
+
 class AnomalyDetectionAgent:
     """
     Advanced anomaly detection for cryptocurrency markets
@@ -35,17 +120,25 @@ class AnomalyDetectionAgent:
         self.isolation_forest_params = {
             'contamination': 0.1,
             'random_state': 42,
-            'n_estimators': 100
+            'n_estimators': 100,
+            'max_samples': 'auto',  # min(256, n_samples) per tree
+            'n_jobs': -1
         }
         
         self.dbscan_params = {
             'eps': 0.5,
             'min_samples': 5
         }
+        
+        # Feature matrices at least this large are trained on the GPU when cuML is installed
+        self.gpu_min_samples = config.get('gpu_min_samples', 10_000)
     
-    def detect_price_anomalies(self, data: pd.DataFrame, symbol: str) -> Dict:
+    def detect_price_anomalies(self, data: pd.DataFrame, symbol: str, retrain: bool = False) -> Dict:
         """
         Detect price-based anomalies using multiple methods
+        
+        The scaler and Isolation Forest fitted for a symbol are cached and
+        reused on later calls unless retrain is set.
         """
         try:
             anomalies = {
@@ -56,60 +149,85 @@ class AnomalyDetectionAgent:
                 'anomaly_types': {}
             }
             
-            # 1. Statistical outliers using Z-score
-            price_changes = data['close'].pct_change().dropna()
-            z_scores = np.abs(stats.zscore(price_changes))
-            z_anomalies = np.where(z_scores > 3)[0]
-            
-            for idx in z_anomalies:
-                anomalies['anomalies'].append({
-                    'type': 'statistical_outlier',
-                    'timestamp': data.index[idx],
-                    'price': data['close'].iloc[idx],
-                    'change_percent': price_changes.iloc[idx] * 100,
-                    'z_score': z_scores[idx],
-                    'severity': 'high' if z_scores[idx] > 4 else 'medium'
-                })
-            
-            # 2. Isolation Forest for multivariate anomalies
-            features = self._prepare_anomaly_features(data)
-            if len(features) > 10:  # Need sufficient data
-                scaler = StandardScaler()
-                features_scaled = scaler.fit_transform(features)
+            with _suppress_runtime():
+                # Change and rolling series shared by the detectors below
+                ctx = self._build_context(data)
+                _, _, _, close, _, index = self._arrays(data)
+            
+                # 1. Statistical outliers using Z-score
+                price_changes = ctx['price_changes'].dropna().to_numpy()
+                # Constant prices give a zero std and NaN scores, which never cross the threshold
+                z_scores = np.abs((price_changes - price_changes.mean()) / price_changes.std())
+                z_hits = np.flatnonzero(z_scores > 3)
+                # price_changes dropped the leading NaN, so row positions are shifted by one
+                z_rows = z_hits + 1
+
+                anomalies['anomalies'].extend(
+                    {
+                        'type': 'statistical_outlier',
+                        'timestamp': ts,
+                        'price': price,
+                        'change_percent': change * 100,
+                        'z_score': z,
+                        'severity': 'high' if z > 4 else 'medium'
+                    }
+                    for ts, price, change, z in zip(
+                        index[z_rows],
+                        close[z_rows],
+                        price_changes[z_hits],
+                        z_scores[z_hits]
+                    )
+                )
+            
+                # 2. Isolation Forest for multivariate anomalies
+                features = self._prepare_anomaly_features(data, ctx)
+                if len(features) > 10:  # Need sufficient data
+                    if symbol in self.models and not retrain:
+                        scaler = self.scalers[symbol]
+                        iso_forest = self.models[symbol]
+                        features_scaled = scaler.transform(features)
+                    else:
+                        # features is a fresh float32 matrix, so standardize it in place
+                        scaler = StandardScaler(copy=False)
+                        features_scaled = scaler.fit_transform(features)
+                    
+                        iso_forest = self._fit_isolation_forest(features_scaled)
+                    
+                        self.scalers[symbol] = scaler
+                        self.models[symbol] = iso_forest
                 
-                iso_forest = IsolationForest(**self.isolation_forest_params)
-                anomaly_labels = iso_forest.fit_predict(features_scaled)
-                anomaly_scores = iso_forest.score_samples(features_scaled)
+                    anomaly_scores = iso_forest.score_samples(features_scaled)
                 
-                # Find anomalies (labeled as -1)
-                iso_anomalies = np.where(anomaly_labels == -1)[0]
+                    # Find anomalies (predict() labels scores below offset_ as -1)
+                    iso_anomalies = np.flatnonzero(anomaly_scores < iso_forest.offset_)
                 
-                for idx in iso_anomalies:
-                    anomalies['anomalies'].append({
-                        'type': 'multivariate_anomaly',
-                        'timestamp': data.index[idx],
-                        'price': data['close'].iloc[idx],
-                        'anomaly_score': anomaly_scores[idx],
-                        'severity': 'high' if anomaly_scores[idx] < -0.5 else 'medium'
-                    })
-            
-            # 3. Volume-Price divergence anomalies
-            volume_price_anomalies = self._detect_volume_price_divergence(data)
-            anomalies['anomalies'].extend(volume_price_anomalies)
-            
-            # 4. Sudden spike detection
-            spike_anomalies = self._detect_price_spikes(data)
-            anomalies['anomalies'].extend(spike_anomalies)
-            
-            # 5. Pattern-based anomalies
-            pattern_anomalies = self._detect_pattern_anomalies(data)
-            anomalies['anomalies'].extend(pattern_anomalies)
-            
-            # Calculate severity scores
-            anomalies['severity_scores'] = self._calculate_severity_scores(anomalies['anomalies'])
-            
-            # Categorize anomaly types
-            anomalies['anomaly_types'] = self._categorize_anomalies(anomalies['anomalies'])
+                    anomalies['anomalies'].extend(
+                        {
+                            'type': 'multivariate_anomaly',
+                            'timestamp': ts,
+                            'price': price,
+                            'anomaly_score': score,
+                            'severity': 'high' if score < -0.5 else 'medium'
+                        }
+                        for ts, price, score in zip(
+                            index[iso_anomalies], close[iso_anomalies], anomaly_scores[iso_anomalies]
+                        )
+                    )
+            
+                # 3. Volume-Price divergence anomalies
+                volume_price_anomalies = self._detect_volume_price_divergence(data, ctx)
+                anomalies['anomalies'].extend(volume_price_anomalies)
+            
+                # 4. Sudden spike detection
+                spike_anomalies = self._detect_price_spikes(data, ctx)
+                anomalies['anomalies'].extend(spike_anomalies)
+            
+                # 5. Pattern-based anomalies
+                pattern_anomalies = self._detect_pattern_anomalies(data)
+                anomalies['anomalies'].extend(pattern_anomalies)
+            
+            # Calculate severity scores and categorize anomaly types
+            anomalies['severity_scores'], anomalies['anomaly_types'] = self._summarize_anomalies(anomalies['anomalies'])
             
             logger.info(f"Detected {len(anomalies['anomalies'])} anomalies for {symbol}")
             return anomalies
@@ -130,21 +248,25 @@ class AnomalyDetectionAgent:
                 'risk_level': 'low'
             }
             
-            # 1. Pump and dump detection
-            pump_dump_signals = self._detect_pump_dump(data)
-            manipulation_signals['signals'].extend(pump_dump_signals)
+            with _suppress_runtime():
+                # Change and rolling series shared by the detectors below
+                ctx = self._build_context(data)
             
-            # 2. Wash trading detection
-            wash_trading_signals = self._detect_wash_trading(data)
-            manipulation_signals['signals'].extend(wash_trading_signals)
+                # 1. Pump and dump detection
+                pump_dump_signals = self._detect_pump_dump(data, ctx)
+                manipulation_signals['signals'].extend(pump_dump_signals)
             
-            # 3. Spoofing detection
-            spoofing_signals = self._detect_spoofing(data)
-            manipulation_signals['signals'].extend(spoofing_signals)
+                # 2. Wash trading detection
+                wash_trading_signals = self._detect_wash_trading(data, ctx)
+                manipulation_signals['signals'].extend(wash_trading_signals)
             
-            # 4. Coordinated trading detection
-            coordinated_signals = self._detect_coordinated_trading(data)
-            manipulation_signals['signals'].extend(coordinated_signals)
+                # 3. Spoofing detection
+                spoofing_signals = self._detect_spoofing(data, ctx)
+                manipulation_signals['signals'].extend(spoofing_signals)
+            
+                # 4. Coordinated trading detection
+                coordinated_signals = self._detect_coordinated_trading(data, ctx)
+                manipulation_signals['signals'].extend(coordinated_signals)
             
             # Calculate overall risk level
             if len(manipulation_signals['signals']) > 5:
@@ -170,39 +292,59 @@ class AnomalyDetectionAgent:
                 'recovery_analysis': {}
             }
             
-            # Calculate price changes
-            price_changes = data['close'].pct_change()
-            
-            # Define flash crash criteria
-            crash_threshold = -0.05  # 5% drop
-            recovery_threshold = 0.03  # 3% recovery
-            time_window = 10  # minutes
-            
-            # Find potential flash crashes
-            for i in range(len(data) - time_window):
-                window_data = data.iloc[i:i+time_window]
-                window_changes = price_changes.iloc[i:i+time_window]
-                
-                # Check for rapid decline
-                min_change = window_changes.min()
-                if min_change < crash_threshold:
-                    crash_idx = window_changes.idxmin()
-                    
-                    # Check for recovery
-                    post_crash_data = data.iloc[i+time_window:i+time_window*2]
-                    if len(post_crash_data) > 0:
-                        recovery = (post_crash_data['close'].max() - data['close'].iloc[crash_idx]) / data['close'].iloc[crash_idx]
-                        
-                        flash_events['events'].append({
-                            'type': 'flash_crash',
-                            'timestamp': crash_idx,
-                            'price_before': data['close'].iloc[i],
-                            'price_crash': data['close'].iloc[crash_idx],
-                            'crash_magnitude': min_change * 100,
-                            'recovery_percent': recovery * 100,
-                            'volume_spike': window_data['volume'].max() / window_data['volume'].mean(),
-                            'duration_minutes': time_window
-                        })
+            with _suppress_runtime():
+                # Calculate price changes
+                price_changes = data['close'].pct_change()
+                close = data['close'].to_numpy()
+            
+                # Define flash crash criteria
+                crash_threshold = -0.05  # 5% drop
+                recovery_threshold = 0.03  # 3% recovery
+                time_window = 10  # minutes
+            
+                # Forward-looking windows covering rows [i, i + time_window)
+                forward = pd.api.indexers.FixedForwardWindowIndexer(window_size=time_window)
+                n_starts = max(len(data) - time_window, 0)
+            
+                # Find potential flash crashes (rapid decline within the window)
+                window_min = price_changes.rolling(forward, min_periods=1).min().to_numpy()[:n_starts]
+                starts = np.flatnonzero(window_min < crash_threshold)
+            
+                # Locate the crash bar inside each flagged window
+                changes = np.nan_to_num(price_changes.to_numpy(), nan=np.inf)
+                crash_rows = starts.copy()
+                if starts.size:
+                    windows = np.lib.stride_tricks.sliding_window_view(changes, time_window)
+                    crash_rows += windows[starts].argmin(axis=1)
+            
+                # Check for recovery over the following window
+                post_max = data['close'].rolling(forward, min_periods=1).max().to_numpy()
+                crash_prices = close[crash_rows]
+                recovery = (post_max[starts + time_window] - crash_prices) / crash_prices
+            
+                volume_window = data['volume'].rolling(forward)
+                volume_spike = (volume_window.max() / volume_window.mean()).to_numpy()
+            
+                flash_events['events'] = [
+                    {
+                        'type': 'flash_crash',
+                        'timestamp': ts,
+                        'price_before': price_before,
+                        'price_crash': price_crash,
+                        'crash_magnitude': min_change * 100,
+                        'recovery_percent': recovered * 100,
+                        'volume_spike': spike,
+                        'duration_minutes': time_window
+                    }
+                    for ts, price_before, price_crash, min_change, recovered, spike in zip(
+                        data.index[crash_rows],
+                        close[starts],
+                        crash_prices,
+                        window_min[starts],
+                        recovery,
+                        volume_spike[starts]
+                    )
+                ]
             
             return flash_events
             
@@ -210,106 +352,199 @@ class AnomalyDetectionAgent:
             logger.error(f"Error detecting flash crashes: {str(e)}")
             raise
     
-    def _prepare_anomaly_features(self, data: pd.DataFrame) -> np.ndarray:
+    def analyze_symbols(self, data_by_symbol: Dict[str, pd.DataFrame], max_workers: Optional[int] = None) -> Dict:
+        """
+        Run price anomaly, manipulation and flash crash detection for many symbols in parallel
+        """
+        try:
+            symbols = list(data_by_symbol)
+            if not symbols:
+                return {}
+            
+            max_workers = min(max_workers or os.cpu_count() or 1, len(symbols))
+            if max_workers <= 1:
+                # Starting a worker costs more than a single symbol's detection
+                return {symbol: self._run_detectors(symbol, data_by_symbol[symbol]) for symbol in symbols}
+            
+            # Hand symbols out in chunks so the agent is pickled once per chunk, not per symbol
+            chunksize = max(1, len(symbols) // (max_workers * 4))
+            
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=_SPAWN) as executor:
+                outputs = list(executor.map(
+                    self._analyze_symbol,
+                    symbols,
+                    [data_by_symbol[symbol] for symbol in symbols],
+                    chunksize=chunksize
+                ))
+            
+            results = {}
+            for symbol, (result, scaler, model) in zip(symbols, outputs):
+                # Keep the models fitted in the workers so later calls can reuse them
+                if model is not None:
+                    self.scalers[symbol] = scaler
+                    self.models[symbol] = model
+                results[symbol] = result
+            
+            logger.info(f"Analyzed {len(results)} symbols with {max_workers} workers")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error analyzing symbols: {str(e)}")
+            raise
+    
+    def _analyze_symbol(self, symbol: str, data: pd.DataFrame) -> Tuple[Dict, Optional[StandardScaler], Optional[IsolationForest]]:
+        """Worker entry point for analyze_symbols"""
+        # Each worker is already one process per core; don't fan out trees as well
+        self.isolation_forest_params['n_jobs'] = 1
+        
+        result = self._run_detectors(symbol, data)
+        return result, self.scalers.get(symbol), self.models.get(symbol)
+    
+    def _run_detectors(self, symbol: str, data: pd.DataFrame) -> Dict:
+        """Run price anomaly, manipulation and flash crash detection for one symbol"""
+        return {
+            'price_anomalies': self.detect_price_anomalies(data, symbol),
+            'market_manipulation': self.detect_market_manipulation(data, symbol),
+            'flash_crashes': self.detect_flash_crashes(data, symbol)
+        }
+    
+    def _fit_isolation_forest(self, features: np.ndarray):
+        """Fit an Isolation Forest, on the GPU for large batches when cuML is available"""
+        if GPUIsolationForest is not None and len(features) >= self.gpu_min_samples:
+            params = {k: v for k, v in self.isolation_forest_params.items() if k != 'n_jobs'}
+            try:
+                model = GPUIsolationForest(**params).fit(features)
+                # The detectors score with sklearn's API and cache the model, so only accept
+                # a GPU model that provides it
+                if not hasattr(model, 'offset_'):
+                    raise AttributeError("GPU model has no offset_")
+                model.score_samples(features[:1])
+                return model
+            except Exception as e:
+                logger.warning(f"GPU Isolation Forest failed, falling back to CPU: {str(e)}")
+        
+        return IsolationForest(**self.isolation_forest_params).fit(features)
+    
+    def _arrays(self, data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, pd.Index]:
+        """Return the OHLCV columns as float64 arrays plus the index, for positional access"""
+        return (
+            data['open'].to_numpy(dtype=np.float64),
+            data['high'].to_numpy(dtype=np.float64),
+            data['low'].to_numpy(dtype=np.float64),
+            data['close'].to_numpy(dtype=np.float64),
+            data['volume'].to_numpy(dtype=np.float64),
+            data.index
+        )
+    
+    def _build_context(self, data: pd.DataFrame) -> Dict:
+        """Compute the change and rolling(20) series shared by several detectors once per frame"""
+        close_window = data['close'].rolling(20)
+        
+        return {
+            'price_changes': data['close'].pct_change(),
+            'volume_changes': data['volume'].pct_change(),
+            'close_mean_20': close_window.mean(),
+            'close_std_20': close_window.std(),
+            'volume_mean_20': data['volume'].rolling(20).mean()
+        }
+    
+    def _prepare_anomaly_features(self, data: pd.DataFrame, ctx: Optional[Dict] = None) -> np.ndarray:
         """Prepare features for multivariate anomaly detection"""
-        features = []
+        ctx = ctx or self._build_context(data)
+        open_price, high_price, low_price, close, volume, _ = self._arrays(data)
+        
+        # Columns are written in place into one column-major float32 matrix
+        features = np.empty((len(data), 10), dtype=np.float32, order='F')
         
         # Price-based features
-        features.append(data['close'].pct_change().fillna(0))
-        features.append(data['high'] / data['low'] - 1)
-        features.append(data['close'] / data['open'] - 1)
+        features[:, 0] = ctx['price_changes'].fillna(0).to_numpy()
+        features[:, 1] = high_price / low_price - 1
+        features[:, 2] = close / open_price - 1
         
         # Volume features
-        features.append(data['volume'].pct_change().fillna(0))
-        features.append(data['volume'] / data['volume'].rolling(20).mean() - 1)
+        features[:, 3] = ctx['volume_changes'].fillna(0).to_numpy()
+        features[:, 4] = volume / ctx['volume_mean_20'].to_numpy() - 1
         
         # Volatility features
-        features.append(data['close'].rolling(20).std())
-        features.append(data['high'].rolling(20).std())
+        features[:, 5] = ctx['close_std_20'].to_numpy()
+        features[:, 6] = data['high'].rolling(20).std().to_numpy()
         
         # Moving average deviations
-        for period in [5, 10, 20]:
-            ma = data['close'].rolling(period).mean()
-            features.append((data['close'] - ma) / ma)
+        for column, period in enumerate([5, 10], start=7):
+            ma = data['close'].rolling(period).mean().to_numpy()
+            features[:, column] = (close - ma) / ma
+        ma = ctx['close_mean_20'].to_numpy()
+        features[:, 9] = (close - ma) / ma
         
-        return np.column_stack(features)
+        return features
     
-    def _detect_volume_price_divergence(self, data: pd.DataFrame) -> List[Dict]:
+    def _detect_volume_price_divergence(self, data: pd.DataFrame, ctx: Optional[Dict] = None) -> List[Dict]:
         """Detect volume-price divergence anomalies"""
-        anomalies = []
+        ctx = ctx or self._build_context(data)
+        _, _, _, close, _, index = self._arrays(data)
         
         # Calculate price and volume changes
-        price_changes = data['close'].pct_change()
-        volume_changes = data['volume'].pct_change()
-        
-        # Find divergences
-        for i in range(1, len(data)):
-            price_change = price_changes.iloc[i]
-            volume_change = volume_changes.iloc[i]
-            
-            # Significant price increase with volume decrease
-            if price_change > 0.02 and volume_change < -0.3:
-                anomalies.append({
-                    'type': 'volume_price_divergence',
-                    'subtype': 'price_up_volume_down',
-                    'timestamp': data.index[i],
-                    'price': data['close'].iloc[i],
-                    'price_change': price_change * 100,
-                    'volume_change': volume_change * 100,
-                    'severity': 'medium'
-                })
-            
-            # Significant price decrease with volume increase
-            elif price_change < -0.02 and volume_change > 0.5:
-                anomalies.append({
-                    'type': 'volume_price_divergence',
-                    'subtype': 'price_down_volume_up',
-                    'timestamp': data.index[i],
-                    'price': data['close'].iloc[i],
-                    'price_change': price_change * 100,
-                    'volume_change': volume_change * 100,
-                    'severity': 'high'
-                })
-        
-        return anomalies
+        price_changes = ctx['price_changes'].to_numpy()
+        volume_changes = ctx['volume_changes'].to_numpy()
+
+        # Significant price increase with volume decrease
+        up_mask = (price_changes > 0.02) & (volume_changes < -0.3)
+        # Significant price decrease with volume increase
+        down_mask = (price_changes < -0.02) & (volume_changes > 0.5)
+
+        # The two conditions are mutually exclusive, so gather them together to keep row order
+        hits = np.flatnonzero(up_mask | down_mask)
+
+        return [
+            {
+                'type': 'volume_price_divergence',
+                'subtype': 'price_up_volume_down' if is_up else 'price_down_volume_up',
+                'timestamp': ts,
+                'price': price,
+                'price_change': price_change * 100,
+                'volume_change': volume_change * 100,
+                'severity': 'medium' if is_up else 'high'
+            }
+            for ts, price, price_change, volume_change, is_up in zip(
+                index[hits],
+                close[hits],
+                price_changes[hits],
+                volume_changes[hits],
+                up_mask[hits]
+            )
+        ]
     
-    def _detect_price_spikes(self, data: pd.DataFrame) -> List[Dict]:
+    def _detect_price_spikes(self, data: pd.DataFrame, ctx: Optional[Dict] = None) -> List[Dict]:
         """Detect sudden price spikes"""
-        anomalies = []
-        
+        ctx = ctx or self._build_context(data)
+        _, _, _, close, _, index = self._arrays(data)
+
         # Calculate rolling statistics
-        rolling_mean = data['close'].rolling(20).mean()
-        rolling_std = data['close'].rolling(20).std()
-        
-        # Find spikes
-        for i in range(20, len(data)):
-            current_price = data['close'].iloc[i]
-            mean_price = rolling_mean.iloc[i]
-            std_price = rolling_std.iloc[i]
-            
-            # Check for upward spike
-            if current_price > mean_price + 3 * std_price:
-                anomalies.append({
-                    'type': 'price_spike',
-                    'subtype': 'upward_spike',
-                    'timestamp': data.index[i],
-                    'price': current_price,
-                    'deviation_factor': (current_price - mean_price) / std_price,
-                    'severity': 'high'
-                })
-            
-            # Check for downward spike
-            elif current_price < mean_price - 3 * std_price:
-                anomalies.append({
-                    'type': 'price_spike',
-                    'subtype': 'downward_spike',
-                    'timestamp': data.index[i],
-                    'price': current_price,
-                    'deviation_factor': (mean_price - current_price) / std_price,
-                    'severity': 'high'
-                })
-        
-        return anomalies
+        rolling_mean = ctx['close_mean_20'].to_numpy()
+        rolling_std = ctx['close_std_20'].to_numpy()
+
+        # Find spikes, skipping the first 20 rows
+        up_mask = close > rolling_mean + 3 * rolling_std
+        down_mask = close < rolling_mean - 3 * rolling_std
+        up_mask[:20] = False
+        down_mask[:20] = False
+
+        hits = np.flatnonzero(up_mask | down_mask)
+        deviation = np.abs(close[hits] - rolling_mean[hits]) / rolling_std[hits]
+
+        return [
+            {
+                'type': 'price_spike',
+                'subtype': 'upward_spike' if is_up else 'downward_spike',
+                'timestamp': ts,
+                'price': price,
+                'deviation_factor': factor,
+                'severity': 'high'
+            }
+            for ts, price, factor, is_up in zip(
+                index[hits], close[hits], deviation, up_mask[hits]
+            )
+        ]
     
     def _detect_pattern_anomalies(self, data: pd.DataFrame) -> List[Dict]:
         """Detect pattern-based anomalies"""
@@ -327,200 +562,285 @@ class AnomalyDetectionAgent:
     
     def _detect_gaps(self, data: pd.DataFrame) -> List[Dict]:
         """Detect price gaps"""
-        anomalies = []
+        current_open, _, _, close, _, index = self._arrays(data)
         
-        for i in range(1, len(data)):
-            prev_close = data['close'].iloc[i-1]
-            current_open = data['open'].iloc[i]
-            
-            gap_percent = (current_open - prev_close) / prev_close * 100
-            
-            if abs(gap_percent) > 2:  # 2% gap threshold
-                anomalies.append({
-                    'type': 'price_gap',
-                    'subtype': 'gap_up' if gap_percent > 0 else 'gap_down',
-                    'timestamp': data.index[i],
-                    'gap_percent': gap_percent,
-                    'prev_close': prev_close,
-                    'current_open': current_open,
-                    'severity': 'high' if abs(gap_percent) > 5 else 'medium'
-                })
-        
-        return anomalies
+        prev_close = np.empty_like(close)
+        prev_close[:1] = np.nan
+        prev_close[1:] = close[:-1]
+
+        gap_percent = (current_open - prev_close) / prev_close * 100
+        abs_gap = np.abs(gap_percent)
+
+        hits = np.flatnonzero(abs_gap > 2)  # 2% gap threshold
+
+        return [
+            {
+                'type': 'price_gap',
+                'subtype': subtype,
+                'timestamp': ts,
+                'gap_percent': gap,
+                'prev_close': prev,
+                'current_open': open_,
+                'severity': severity
+            }
+            for ts, gap, prev, open_, subtype, severity in zip(
+                index[hits],
+                gap_percent[hits],
+                prev_close[hits],
+                current_open[hits],
+                np.where(gap_percent[hits] > 0, 'gap_up', 'gap_down'),
+                np.where(abs_gap[hits] > 5, 'high', 'medium')
+            )
+        ]
     
     def _detect_candlestick_anomalies(self, data: pd.DataFrame) -> List[Dict]:
         """Detect unusual candlestick patterns"""
-        anomalies = []
-        
-        for i in range(len(data)):
-            open_price = data['open'].iloc[i]
-            high_price = data['high'].iloc[i]
-            low_price = data['low'].iloc[i]
-            close_price = data['close'].iloc[i]
-            
+        open_price, high_price, low_price, close_price, _, index = self._arrays(data)
+
+        if numba is not None:
+            codes, ratios = _classify_candles(open_price, high_price, low_price, close_price)
+        else:
             # Calculate body and wick sizes
-            body_size = abs(close_price - open_price)
-            upper_wick = high_price - max(open_price, close_price)
-            lower_wick = min(open_price, close_price) - low_price
+            body_size = np.abs(close_price - open_price)
+            upper_wick = high_price - np.maximum(open_price, close_price)
+            lower_wick = np.minimum(open_price, close_price) - low_price
             total_range = high_price - low_price
-            
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                body_ratio = body_size / total_range
+                lower_wick_ratio = lower_wick / body_size
+
             # Detect doji (very small body)
-            if body_size / total_range < 0.1 and total_range > 0:
+            doji_mask = (total_range > 0) & (body_ratio < 0.1)
+            # Detect hammer/hanging man (long lower wick)
+            hammer_mask = ~doji_mask & (lower_wick > 2 * body_size) & (upper_wick < body_size)
+
+            codes = np.select([doji_mask, hammer_mask], [1, 2], 0)
+            ratios = np.where(doji_mask, body_ratio, lower_wick_ratio)
+
+        hits = np.flatnonzero(codes)
+
+        anomalies = []
+        for i, ts in zip(hits, index[hits]):
+            if codes[i] == 1:
                 anomalies.append({
                     'type': 'candlestick_pattern',
                     'subtype': 'doji',
-                    'timestamp': data.index[i],
-                    'body_ratio': body_size / total_range,
+                    'timestamp': ts,
+                    'body_ratio': ratios[i],
                     'severity': 'low'
                 })
-            
-            # Detect hammer/hanging man (long lower wick)
-            elif lower_wick > 2 * body_size and upper_wick < body_size:
+            else:
                 anomalies.append({
                     'type': 'candlestick_pattern',
                     'subtype': 'hammer_hanging_man',
-                    'timestamp': data.index[i],
-                    'lower_wick_ratio': lower_wick / body_size,
+                    'timestamp': ts,
+                    'lower_wick_ratio': ratios[i],
                     'severity': 'medium'
                 })
-        
+
         return anomalies
     
-    def _detect_pump_dump(self, data: pd.DataFrame) -> List[Dict]:
+    def _detect_pump_dump(self, data: pd.DataFrame, ctx: Optional[Dict] = None) -> List[Dict]:
         """Detect pump and dump patterns"""
-        signals = []
+        ctx = ctx or self._build_context(data)
         
         # Look for rapid price increases followed by rapid decreases
-        price_changes = data['close'].pct_change()
-        volume_changes = data['volume'].pct_change()
-        
-        for i in range(10, len(data) - 10):
-            # Check for pump phase
-            pump_window = price_changes.iloc[i-5:i+1]
-            pump_volume = volume_changes.iloc[i-5:i+1]
-            
-            if pump_window.sum() > 0.15 and pump_volume.mean() > 0.5:  # 15% price increase with high volume
-                # Check for dump phase
-                dump_window = price_changes.iloc[i+1:i+11]
-                
-                if dump_window.sum() < -0.1:  # 10% price decrease
-                    signals.append({
-                        'type': 'pump_dump',
-                        'pump_start': data.index[i-5],
-                        'pump_end': data.index[i],
-                        'dump_end': data.index[i+10],
-                        'pump_magnitude': pump_window.sum() * 100,
-                        'dump_magnitude': dump_window.sum() * 100,
-                        'volume_spike': pump_volume.mean() * 100,
-                        'severity': 'high'
-                    })
-        
-        return signals
+        price_changes = ctx['price_changes']
+        volume_changes = ctx['volume_changes']
+
+        # Pump phase covers bars i-5..i, dump phase covers bars i+1..i+10
+        pump_sum = price_changes.rolling(6).sum().to_numpy()
+        pump_volume = volume_changes.rolling(6).mean().to_numpy()
+        dump_sum = price_changes.rolling(10).sum().shift(-10).to_numpy()
+
+        mask = (
+            (pump_sum > 0.15) &  # 15% price increase
+            (pump_volume > 0.5) &  # with high volume
+            (dump_sum < -0.1)  # followed by a 10% price decrease
+        )
+        mask[:10] = False
+        mask[max(len(data) - 10, 0):] = False
+        hits = np.flatnonzero(mask)
+
+        return [
+            {
+                'type': 'pump_dump',
+                'pump_start': pump_start,
+                'pump_end': pump_end,
+                'dump_end': dump_end,
+                'pump_magnitude': pump * 100,
+                'dump_magnitude': dump * 100,
+                'volume_spike': volume * 100,
+                'severity': 'high'
+            }
+            for pump_start, pump_end, dump_end, pump, dump, volume in zip(
+                data.index[hits - 5],
+                data.index[hits],
+                data.index[hits + 10],
+                pump_sum[hits],
+                dump_sum[hits],
+                pump_volume[hits]
+            )
+        ]
     
-    def _detect_wash_trading(self, data: pd.DataFrame) -> List[Dict]:
+    def _detect_wash_trading(self, data: pd.DataFrame, ctx: Optional[Dict] = None) -> List[Dict]:
         """Detect potential wash trading patterns"""
-        signals = []
-        
+        ctx = ctx or self._build_context(data)
+        volume = data['volume'].to_numpy()
+
+        # Statistics over the preceding 20 bars, excluding the current one
+        volume_mean = ctx['volume_mean_20'].shift(1).to_numpy()
+        price_volatility = (ctx['close_std_20'] / ctx['close_mean_20']).shift(1).to_numpy()
+
         # Look for high volume with minimal price movement
-        for i in range(20, len(data)):
-            window_data = data.iloc[i-20:i]
-            
-            volume_mean = window_data['volume'].mean()
-            volume_current = data['volume'].iloc[i]
-            price_volatility = window_data['close'].std() / window_data['close'].mean()
-            
-            # High volume with low volatility
-            if volume_current > 3 * volume_mean and price_volatility < 0.01:
-                signals.append({
-                    'type': 'wash_trading',
-                    'timestamp': data.index[i],
-                    'volume_ratio': volume_current / volume_mean,
-                    'price_volatility': price_volatility,
-                    'severity': 'medium'
-                })
-        
-        return signals
+        hits = np.flatnonzero((volume > 3 * volume_mean) & (price_volatility < 0.01))
+
+        return [
+            {
+                'type': 'wash_trading',
+                'timestamp': ts,
+                'volume_ratio': ratio,
+                'price_volatility': volatility,
+                'severity': 'medium'
+            }
+            for ts, ratio, volatility in zip(
+                data.index[hits],
+                volume[hits] / volume_mean[hits],
+                price_volatility[hits]
+            )
+        ]
     
-    def _detect_spoofing(self, data: pd.DataFrame) -> List[Dict]:
+    def _detect_spoofing(self, data: pd.DataFrame, ctx: Optional[Dict] = None) -> List[Dict]:
         """Detect potential spoofing patterns (simplified)"""
-        signals = []
+        ctx = ctx or self._build_context(data)
         
         # Look for rapid volume spikes followed by immediate reversals
-        volume_changes = data['volume'].pct_change()
-        
-        for i in range(2, len(data) - 2):
-            if (volume_changes.iloc[i] > 2 and  # Large volume spike
-                volume_changes.iloc[i+1] < -0.5 and  # Immediate volume drop
-                abs(data['close'].pct_change().iloc[i]) < 0.01):  # Minimal price impact
-                
-                signals.append({
-                    'type': 'spoofing',
-                    'timestamp': data.index[i],
-                    'volume_spike': volume_changes.iloc[i] * 100,
-                    'volume_drop': volume_changes.iloc[i+1] * 100,
-                    'price_impact': data['close'].pct_change().iloc[i] * 100,
-                    'severity': 'medium'
-                })
-        
-        return signals
+        volume_changes = ctx['volume_changes'].to_numpy()
+        next_volume_changes = np.roll(volume_changes, -1)
+        price_changes = ctx['price_changes'].to_numpy()
+
+        mask = (
+            (volume_changes > 2) &  # Large volume spike
+            (next_volume_changes < -0.5) &  # Immediate volume drop
+            (np.abs(price_changes) < 0.01)  # Minimal price impact
+        )
+        mask[:2] = False
+        mask[-2:] = False
+        hits = np.flatnonzero(mask)
+
+        return [
+            {
+                'type': 'spoofing',
+                'timestamp': ts,
+                'volume_spike': spike * 100,
+                'volume_drop': drop * 100,
+                'price_impact': impact * 100,
+                'severity': 'medium'
+            }
+            for ts, spike, drop, impact in zip(
+                data.index[hits],
+                volume_changes[hits],
+                next_volume_changes[hits],
+                price_changes[hits]
+            )
+        ]
     
-    def _detect_coordinated_trading(self, data: pd.DataFrame) -> List[Dict]:
+    def _detect_coordinated_trading(self, data: pd.DataFrame, ctx: Optional[Dict] = None) -> List[Dict]:
         """Detect coordinated trading patterns"""
-        signals = []
+        ctx = ctx or self._build_context(data)
         
         # Look for synchronized volume and price movements
-        price_changes = data['close'].pct_change()
-        volume_changes = data['volume'].pct_change()
-        
-        # Calculate correlation in rolling windows
-        for i in range(20, len(data)):
-            window_price = price_changes.iloc[i-20:i]
-            window_volume = volume_changes.iloc[i-20:i]
-            
-            correlation = window_price.corr(window_volume)
-            
-            # High correlation might indicate coordination
-            if abs(correlation) > 0.8:
-                signals.append({
-                    'type': 'coordinated_trading',
-                    'timestamp': data.index[i],
-                    'price_volume_correlation': correlation,
-                    'severity': 'low' if abs(correlation) < 0.9 else 'medium'
-                })
-        
-        return signals
+        price_changes = ctx['price_changes']
+        volume_changes = ctx['volume_changes']
+
+        # Correlation over the preceding 20 bars, excluding the current one
+        correlation = (
+            price_changes.rolling(20, min_periods=2).corr(volume_changes).shift(1).to_numpy()
+        )
+        abs_correlation = np.abs(correlation)
+
+        # High correlation might indicate coordination
+        mask = abs_correlation > 0.8
+        mask[:20] = False
+        hits = np.flatnonzero(mask)
+
+        return [
+            {
+                'type': 'coordinated_trading',
+                'timestamp': ts,
+                'price_volume_correlation': corr,
+                'severity': severity
+            }
+            for ts, corr, severity in zip(
+                data.index[hits],
+                correlation[hits],
+                np.where(abs_correlation[hits] < 0.9, 'low', 'medium')
+            )
+        ]
+    
+    def to_structured_array(self, records: List[Dict]) -> np.ndarray:
+        """
+        Pack anomaly/signal dicts into an ANOMALY_DTYPE array for bulk storage or serialization.
+        Only the shared fields are kept; each type's headline metric goes into 'score'.
+        """
+        def pack(record: Dict) -> Tuple:
+            record_type = record.get('type', 'unknown')
+            timestamp = record.get('timestamp', record.get('pump_end'))
+            if not isinstance(timestamp, (datetime, np.datetime64)):
+                timestamp = None  # positional (integer) index labels have no time value
+            
+            score_field = SCORE_FIELDS.get(record_type)
+            if record_type == 'candlestick_pattern':
+                score_field = 'body_ratio' if 'body_ratio' in record else 'lower_wick_ratio'
+            
+            return (
+                record_type,
+                record.get('subtype', ''),
+                timestamp,
+                record.get('price', record.get('price_crash', np.nan)),
+                record.get('severity', 'low'),
+                record.get(score_field, np.nan)
+            )
+        
+        return np.array([pack(record) for record in records], dtype=ANOMALY_DTYPE)
+    
+    def to_dicts(self, records: np.ndarray) -> List[Dict]:
+        """Convert a to_structured_array() result back into a list of dicts"""
+        return [
+            {
+                'type': str(record['type']),
+                'subtype': str(record['subtype']),
+                'timestamp': pd.Timestamp(record['timestamp']) if not np.isnat(record['timestamp']) else None,
+                'price': float(record['price']),
+                'severity': str(record['severity']),
+                'score': float(record['score'])
+            }
+            for record in records
+        ]
     
-    def _calculate_severity_scores(self, anomalies: List[Dict]) -> Dict:
-        """Calculate severity scores for anomalies"""
+    def _summarize_anomalies(self, anomalies: List[Dict]) -> Tuple[Dict, Dict]:
+        """Calculate severity scores and categorize anomalies by type in a single pass"""
         severity_counts = {'low': 0, 'medium': 0, 'high': 0}
+        categories = {}
         
         for anomaly in anomalies:
-            severity = anomaly.get('severity', 'low')
-            severity_counts[severity] += 1
+            severity_counts[anomaly.get('severity', 'low')] += 1
+            anomaly_type = anomaly.get('type', 'unknown')
+            categories[anomaly_type] = categories.get(anomaly_type, 0) + 1
         
         total_anomalies = len(anomalies)
         if total_anomalies == 0:
-            return {'overall_score': 0, 'distribution': severity_counts}
+            return {'overall_score': 0, 'distribution': severity_counts}, categories
         
         # Calculate weighted score
         weights = {'low': 1, 'medium': 3, 'high': 5}
         weighted_score = sum(severity_counts[sev] * weights[sev] for sev in severity_counts)
         overall_score = weighted_score / total_anomalies
         
-        return {
+        severity_scores = {
             'overall_score': overall_score,
             'distribution': severity_counts,
             'total_anomalies': total_anomalies
         }
-    
-    def _categorize_anomalies(self, anomalies: List[Dict]) -> Dict:
-        """Categorize anomalies by type"""
-        categories = {}
-        
-        for anomaly in anomalies:
-            anomaly_type = anomaly.get('type', 'unknown')
-            if anomaly_type not in categories:
-                categories[anomaly_type] = 0
-            categories[anomaly_type] += 1
-        
-        return categories
+        return severity_scores, categories
@@ -6,19 +6,754 @@ Implements advanced ML models for cryptocurrency price forecasting
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Hashable, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+import os
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.ensemble import HistGradientBoostingRegressor, GradientBoostingRegressor
+from threadpoolctl import threadpool_limits
 import xgboost as xgb
 import lightgbm as lgb
-from prophet import Prophet
-import ta
+
+try:
+    # Optional Stan-backed forecaster; the built-in SeasonalTrendModel is used otherwise
+    from prophet import Prophet
+except ImportError:
+    Prophet = None
+
+try:
+    # Optional JIT compiler for the fused feature kernel
+    import numba
+except ImportError:
+    numba = None
 
 logger = logging.getLogger(__name__)
 
+# Default thread count for the tree models: leave one core free to avoid oversubscription
+N_JOBS = max(1, (os.cpu_count() or 2) - 1)
+
+# Estimator class behind each entry of CryptoPredictionAgent.model_configs
+MODEL_CLASSES = {
+    'xgboost': xgb.XGBRegressor,
+    'lightgbm': lgb.LGBMRegressor,
+    'hist_gradient_boosting': HistGradientBoostingRegressor,
+    'gradient_boosting': GradientBoostingRegressor
+}
+
+# Training workers are spawned rather than forked: the OpenMP pools used by
+# XGBoost/LightGBM in the parent are not fork-safe
+_SPAWN = multiprocessing.get_context('spawn')
+
+# Fixed indicator schedule computed by the fused feature kernel
+MA_PERIODS = (7, 14, 21, 50, 100, 200)
+MA_ALPHAS = tuple(2.0 / (period + 1) for period in MA_PERIODS)
+ROLLING_WINDOWS = (7, 14, 30)
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BB_WINDOW, BB_DEV = 20, 2.0
+STOCH_WINDOW, STOCH_SMOOTH = 14, 3
+VOLUME_WINDOW = 20
+VOLATILITY_RATIO_WINDOW = 50
+LEVEL_WINDOW = 20
+MOMENTUM_PERIODS = (1, 3, 7, 14, 30)
+LAG_PERIODS = (1, 2, 3, 5, 7)
+
+INDICATOR_COLUMNS = (
+    ['price_change', 'price_change_abs', 'high_low_ratio', 'open_close_ratio']
+    + [f'{kind}_{period}' for period in MA_PERIODS for kind in ('sma', 'ema')]
+    + ['rsi', 'macd', 'macd_signal', 'macd_histogram',
+       'bb_upper', 'bb_lower', 'bb_middle', 'bb_width', 'bb_position',
+       'stoch_k', 'stoch_d', 'volume_sma', 'volume_ratio',
+       'volatility', 'volatility_ratio',
+       'support', 'resistance', 'support_distance', 'resistance_distance']
+    + [f'{stat}_{window}' for window in ROLLING_WINDOWS
+       for stat in ('close_mean', 'close_std', 'close_min', 'close_max', 'volume_mean')]
+)
+
+# Column offsets into the kernel output
+MA_COL = 4
+RSI_COL = MA_COL + 2 * len(MA_PERIODS)
+MACD_COL = RSI_COL + 1
+BB_COL = MACD_COL + 3
+STOCH_COL = BB_COL + 5
+VOLUME_COL = STOCH_COL + 2
+VOLATILITY_COL = VOLUME_COL + 2
+LEVEL_COL = VOLATILITY_COL + 2
+ROLLING_COL = LEVEL_COL + 4
+N_INDICATORS = len(INDICATOR_COLUMNS)
+
+# Full feature matrix layout: kernel indicators, momentum, lags, then optional calendar features
+FEATURE_COLUMNS = (
+    INDICATOR_COLUMNS
+    + [f'momentum_{period}' for period in MOMENTUM_PERIODS]
+    + [f'{source}_lag_{lag}' for lag in LAG_PERIODS for source in ('close', 'volume', 'rsi')]
+)
+TIME_COLUMNS = ['hour', 'day_of_week', 'day_of_month', 'month', 'quarter']
+MOMENTUM_COL = N_INDICATORS
+LAG_COL = MOMENTUM_COL + len(MOMENTUM_PERIODS)
+
+
+def _rolling_std(x, window, ddof=1):
+    """
+    Rolling standard deviation in O(n) using Welford updates: each step adds the
+    incoming value and removes the outgoing one from the running mean and M2.
+    """
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    mean = 0.0
+    m2 = 0.0
+    
+    for i in range(n):
+        if i < window:
+            delta = x[i] - mean
+            mean += delta / (i + 1)
+            m2 += delta * (x[i] - mean)
+        else:
+            old = x[i - window]
+            new_mean = mean + (x[i] - old) / window
+            m2 += (x[i] - old) * (x[i] - new_mean + old - mean)
+            mean = new_mean
+        if i >= window - 1:
+            out[i] = np.sqrt(max(m2, 0.0) / (window - ddof))
+    
+    return out
+
+
+def _rolling_min(x, window):
+    """
+    Rolling minimum in amortized O(n): a monotonic deque of indices keeps
+    increasing values, so the window minimum is always at its front.
+    """
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    deque = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    
+    for i in range(n):
+        while tail > head and x[deque[tail - 1]] >= x[i]:
+            tail -= 1
+        deque[tail] = i
+        tail += 1
+        if deque[head] <= i - window:
+            head += 1
+        if i >= window - 1:
+            out[i] = x[deque[head]]
+    
+    return out
+
+
+def _rolling_max(x, window):
+    """Rolling maximum in amortized O(n), mirroring _rolling_min"""
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    deque = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    
+    for i in range(n):
+        while tail > head and x[deque[tail - 1]] <= x[i]:
+            tail -= 1
+        deque[tail] = i
+        tail += 1
+        if deque[head] <= i - window:
+            head += 1
+        if i >= window - 1:
+            out[i] = x[deque[head]]
+    
+    return out
+
+
+def _compute_indicators(open_price, high_price, low_price, close_price, volume, out):
+    """
+    Fill out (n, N_INDICATORS) with every column of INDICATOR_COLUMNS in a single
+    sweep over the candles; out is usually a float32 slice of the feature matrix.
+    Definitions follow the `ta` defaults (full warm-up windows, Wilder RSI, ddof=0
+    Bollinger deviation); rows still warming up and 0/0 ratios are NaN.
+    """
+    n = close_price.shape[0]
+    out[:] = np.nan
+    
+    # Rolling standard deviations and extremes are filled up front by the O(n) helpers
+    close_volatility = _rolling_std(close_price, BB_WINDOW)
+    support_level = _rolling_min(low_price, LEVEL_WINDOW)
+    resistance_level = _rolling_max(high_price, LEVEL_WINDOW)
+    out[:, VOLATILITY_COL] = close_volatility
+    out[:, LEVEL_COL] = support_level
+    out[:, LEVEL_COL + 1] = resistance_level
+    for k in range(len(ROLLING_WINDOWS)):
+        col = ROLLING_COL + 5 * k
+        out[:, col + 1] = _rolling_std(close_price, ROLLING_WINDOWS[k])
+        out[:, col + 2] = _rolling_min(close_price, ROLLING_WINDOWS[k])
+        out[:, col + 3] = _rolling_max(close_price, ROLLING_WINDOWS[k])
+    stoch_low = _rolling_min(low_price, STOCH_WINDOW)
+    stoch_high = _rolling_max(high_price, STOCH_WINDOW)
+    bb_scale = BB_DEV * np.sqrt((BB_WINDOW - 1) / BB_WINDOW)
+    
+    n_ma = len(MA_PERIODS)
+    n_roll = len(ROLLING_WINDOWS)
+    ma_sum = np.zeros(n_ma)
+    ema = np.zeros(n_ma)
+    roll_close = np.zeros(n_roll)
+    roll_volume = np.zeros(n_roll)
+    bb_sum = 0.0
+    volume_sum = 0.0
+    volatility_sum = 0.0
+    avg_gain = 0.0
+    avg_loss = 0.0
+    ema_fast = 0.0
+    ema_slow = 0.0
+    macd_signal = 0.0
+    
+    rsi_alpha = 1.0 / RSI_WINDOW
+    fast_alpha = 2.0 / (MACD_FAST + 1)
+    slow_alpha = 2.0 / (MACD_SLOW + 1)
+    signal_alpha = 2.0 / (MACD_SIGNAL + 1)
+    
+    for i in range(n):
+        c = close_price[i]
+        v = volume[i]
+        
+        # Basic price features
+        if i > 0:
+            out[i, 0] = c / close_price[i - 1] - 1
+            out[i, 1] = abs(out[i, 0])
+        out[i, 2] = high_price[i] / low_price[i]
+        out[i, 3] = open_price[i] / c
+        
+        # Simple and exponential moving averages
+        for k in range(n_ma):
+            period = MA_PERIODS[k]
+            alpha = MA_ALPHAS[k]
+            ma_sum[k] += c
+            if i >= period:
+                ma_sum[k] -= close_price[i - period]
+            ema[k] = c if i == 0 else alpha * c + (1 - alpha) * ema[k]
+            if i >= period - 1:
+                out[i, MA_COL + 2 * k] = ma_sum[k] / period
+                out[i, MA_COL + 2 * k + 1] = ema[k]
+        
+        # RSI with Wilder smoothing
+        if i > 0:
+            change = c - close_price[i - 1]
+            avg_gain = rsi_alpha * (change if change > 0 else 0.0) + (1 - rsi_alpha) * avg_gain
+            avg_loss = rsi_alpha * (-change if change < 0 else 0.0) + (1 - rsi_alpha) * avg_loss
+        if i >= RSI_WINDOW - 1:
+            out[i, RSI_COL] = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+        
+        # MACD, signal line and histogram
+        ema_fast = c if i == 0 else fast_alpha * c + (1 - fast_alpha) * ema_fast
+        ema_slow = c if i == 0 else slow_alpha * c + (1 - slow_alpha) * ema_slow
+        if i >= MACD_SLOW - 1:
+            macd = ema_fast - ema_slow
+            if i == MACD_SLOW - 1:
+                macd_signal = macd
+            else:
+                macd_signal = signal_alpha * macd + (1 - signal_alpha) * macd_signal
+            out[i, MACD_COL] = macd
+            if i >= MACD_SLOW + MACD_SIGNAL - 2:
+                out[i, MACD_COL + 1] = macd_signal
+                out[i, MACD_COL + 2] = macd - macd_signal
+        
+        # Bollinger Bands and close-price volatility (same 20-candle window)
+        bb_sum += c
+        if i >= BB_WINDOW:
+            bb_sum -= close_price[i - BB_WINDOW]
+        if i >= BB_WINDOW - 1:
+            middle = bb_sum / BB_WINDOW
+            volatility = close_volatility[i]
+            band = bb_scale * volatility
+            out[i, BB_COL] = middle + band
+            out[i, BB_COL + 1] = middle - band
+            out[i, BB_COL + 2] = middle
+            out[i, BB_COL + 3] = 2 * band / middle
+            if band > 0:
+                out[i, BB_COL + 4] = (c - middle + band) / (2 * band)
+            
+            volatility_sum += volatility
+            if i >= BB_WINDOW - 1 + VOLATILITY_RATIO_WINDOW:
+                volatility_sum -= close_volatility[i - VOLATILITY_RATIO_WINDOW]
+            if i >= BB_WINDOW + VOLATILITY_RATIO_WINDOW - 2 and volatility_sum > 0:
+                out[i, VOLATILITY_COL + 1] = volatility / (volatility_sum / VOLATILITY_RATIO_WINDOW)
+        
+        # Stochastic oscillator
+        if i >= STOCH_WINDOW - 1:
+            lowest = stoch_low[i]
+            highest = stoch_high[i]
+            if highest > lowest:
+                out[i, STOCH_COL] = 100 * (c - lowest) / (highest - lowest)
+            if i >= STOCH_WINDOW + STOCH_SMOOTH - 2:
+                out[i, STOCH_COL + 1] = (out[i, STOCH_COL] + out[i - 1, STOCH_COL] + out[i - 2, STOCH_COL]) / STOCH_SMOOTH
+        
+        # Volume moving average
+        volume_sum += v
+        if i >= VOLUME_WINDOW:
+            volume_sum -= volume[i - VOLUME_WINDOW]
+        if i >= VOLUME_WINDOW - 1:
+            volume_sma = volume_sum / VOLUME_WINDOW
+            out[i, VOLUME_COL] = volume_sma
+            if volume_sum > 0:
+                out[i, VOLUME_COL + 1] = v / volume_sma
+        
+        # Support and resistance levels
+        if i >= LEVEL_WINDOW - 1:
+            out[i, LEVEL_COL + 2] = (c - support_level[i]) / c
+            out[i, LEVEL_COL + 3] = (resistance_level[i] - c) / c
+        
+        # Rolling close/volume statistics
+        for k in range(n_roll):
+            window = ROLLING_WINDOWS[k]
+            roll_close[k] += c
+            roll_volume[k] += v
+            if i >= window:
+                roll_close[k] -= close_price[i - window]
+                roll_volume[k] -= volume[i - window]
+            if i >= window - 1:
+                col = ROLLING_COL + 5 * k
+                mean = roll_close[k] / window
+                out[i, col] = mean
+                out[i, col + 4] = roll_volume[k] / window
+
+
+def _fit_trend_seasonal(y, period):
+    """
+    Fit y ~ intercept + slope * t + profile[t % period] by least squares on the
+    trend, then the centered mean profile of the detrended series.
+    Returns (slope, intercept, profile, residual std).
+    """
+    n = y.shape[0]
+    t_mean = (n - 1) / 2.0
+    y_mean = y.mean()
+    cov = 0.0
+    var = 0.0
+    for i in range(n):
+        cov += (i - t_mean) * (y[i] - y_mean)
+        var += (i - t_mean) ** 2
+    slope = cov / var if var > 0 else 0.0
+    intercept = y_mean - slope * t_mean
+    
+    profile = np.zeros(period)
+    counts = np.zeros(period)
+    for i in range(n):
+        profile[i % period] += y[i] - (intercept + slope * i)
+        counts[i % period] += 1
+    for k in range(period):
+        if counts[k] > 0:
+            profile[k] /= counts[k]
+    profile -= profile.mean()
+    
+    sq_resid = 0.0
+    for i in range(n):
+        sq_resid += (y[i] - intercept - slope * i - profile[i % period]) ** 2
+    sigma = np.sqrt(sq_resid / n) if n > 0 else 0.0
+    
+    return slope, intercept, profile, sigma
+
+
+if numba is not None:
+    # The entry points are compiled eagerly for the one input layout they are called with, so the
+    # on-disk cache is loaded at import and the window schedule is folded in as constants
+    _column = numba.types.Array(numba.float64, 1, 'C', readonly=True)
+    _fit_trend_seasonal = numba.njit((_column, numba.int64), cache=True)(_fit_trend_seasonal)
+    _rolling_std = numba.njit(cache=True)(_rolling_std)
+    _rolling_min = numba.njit(cache=True)(_rolling_min)
+    _rolling_max = numba.njit(cache=True)(_rolling_max)
+    _compute_indicators = numba.njit(
+        (_column,) * 5 + (numba.float32[:, :],), cache=True, error_model='numpy'
+    )(_compute_indicators)
+
+
+def _fit_model(name: str, params: Dict, threads: int, X_train: np.ndarray, y_train: pd.Series,
+               X_val: np.ndarray) -> Tuple[object, np.ndarray]:
+    """Worker entry point for train_models: fit one model and predict the validation split"""
+    # Models with an n_jobs parameter take the thread share directly; the OpenMP limit
+    # covers HistGradientBoosting, which has none
+    if 'n_jobs' in params:
+        params = {**params, 'n_jobs': threads}
+    
+    with threadpool_limits(limits=threads, user_api='openmp'):
+        model = MODEL_CLASSES[name](**params)
+        model.fit(X_train, y_train)
+        return model, model.predict(X_val)
+
+
+class _RollingMean:
+    """Running mean over the last `window` values"""
+    
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+    
+    def update(self, x: float) -> float:
+        self.values.append(x)
+        self.total += x
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+        return self.total / self.window if len(self.values) == self.window else np.nan
+
+
+class _RollingStd:
+    """Running standard deviation over the last `window` values (Welford add/remove)"""
+    
+    def __init__(self, window: int, ddof: int = 1):
+        self.window = window
+        self.ddof = ddof
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+    
+    def update(self, x: float) -> float:
+        self.values.append(x)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            new_mean = self.mean + (x - old) / self.window
+            self.m2 += (x - old) * (x - new_mean + old - self.mean)
+            self.mean = new_mean
+        else:
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        if len(self.values) < self.window:
+            return np.nan
+        return np.sqrt(max(self.m2, 0.0) / (self.window - self.ddof))
+
+
+class _RollingExtreme:
+    """Running minimum or maximum over the last `window` values (monotonic deque)"""
+    
+    def __init__(self, window: int, maximum: bool = False):
+        self.window = window
+        self.maximum = maximum
+        self.deque = deque()
+        self.count = 0
+    
+    def update(self, x: float) -> float:
+        i = self.count
+        self.count += 1
+        while self.deque and (self.deque[-1][1] <= x if self.maximum else self.deque[-1][1] >= x):
+            self.deque.pop()
+        self.deque.append((i, x))
+        if self.deque[0][0] <= i - self.window:
+            self.deque.popleft()
+        return self.deque[0][1] if self.count >= self.window else np.nan
+
+
+class FeatureStreamer:
+    """
+    Incremental feature pipeline for live candles
+    
+    Keeps the running state of every indicator (moving sums, EMA values, Welford
+    moments, monotonic deques, Wilder averages) so each new candle yields its
+    feature row in FEATURE_COLUMNS order in time independent of history length.
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.prev_close = np.nan
+        
+        self.sma = [_RollingMean(period) for period in MA_PERIODS]
+        self.ema = [np.nan] * len(MA_PERIODS)
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.ema_fast = np.nan
+        self.ema_slow = np.nan
+        self.macd_signal = np.nan
+        
+        self.bb_mean = _RollingMean(BB_WINDOW)
+        self.volatility = _RollingStd(BB_WINDOW)
+        self.volatility_mean = _RollingMean(VOLATILITY_RATIO_WINDOW)
+        self.stoch_low = _RollingExtreme(STOCH_WINDOW)
+        self.stoch_high = _RollingExtreme(STOCH_WINDOW, maximum=True)
+        self.stoch_k = deque(maxlen=STOCH_SMOOTH)
+        self.volume_mean = _RollingMean(VOLUME_WINDOW)
+        self.support = _RollingExtreme(LEVEL_WINDOW)
+        self.resistance = _RollingExtreme(LEVEL_WINDOW, maximum=True)
+        
+        self.rolling = [
+            (_RollingMean(window), _RollingStd(window), _RollingExtreme(window),
+             _RollingExtreme(window, maximum=True), _RollingMean(window))
+            for window in ROLLING_WINDOWS
+        ]
+        
+        self.closes = deque(maxlen=max(MOMENTUM_PERIODS) + 1)
+        self.lag_sources = deque(maxlen=max(LAG_PERIODS) + 1)
+    
+    def update(self, open_price: float, high_price: float, low_price: float,
+               close_price: float, volume: float, timestamp=None) -> np.ndarray:
+        """
+        Consume one candle and return its feature row (float32)
+        
+        Calendar features are appended in TIME_COLUMNS order when a timestamp is
+        given. Entries whose warm-up window is not yet full are NaN.
+        """
+        i = self.count
+        self.count += 1
+        c = float(close_price)
+        v = float(volume)
+        row = np.full(len(FEATURE_COLUMNS) + (len(TIME_COLUMNS) if timestamp is not None else 0), np.nan)
+        
+        # Basic price features
+        if i > 0:
+            row[0] = c / self.prev_close - 1
+            row[1] = abs(row[0])
+        row[2] = high_price / low_price
+        row[3] = open_price / c
+        
+        # Simple and exponential moving averages
+        for k, period in enumerate(MA_PERIODS):
+            alpha = MA_ALPHAS[k]
+            self.ema[k] = c if i == 0 else alpha * c + (1 - alpha) * self.ema[k]
+            row[MA_COL + 2 * k] = self.sma[k].update(c)
+            if i >= period - 1:
+                row[MA_COL + 2 * k + 1] = self.ema[k]
+        
+        # RSI with Wilder smoothing
+        rsi_alpha = 1.0 / RSI_WINDOW
+        if i > 0:
+            change = c - self.prev_close
+            self.avg_gain = rsi_alpha * (change if change > 0 else 0.0) + (1 - rsi_alpha) * self.avg_gain
+            self.avg_loss = rsi_alpha * (-change if change < 0 else 0.0) + (1 - rsi_alpha) * self.avg_loss
+        if i >= RSI_WINDOW - 1:
+            row[RSI_COL] = 100.0 if self.avg_loss == 0 else 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+        
+        # MACD, signal line and histogram
+        fast_alpha = 2.0 / (MACD_FAST + 1)
+        slow_alpha = 2.0 / (MACD_SLOW + 1)
+        signal_alpha = 2.0 / (MACD_SIGNAL + 1)
+        self.ema_fast = c if i == 0 else fast_alpha * c + (1 - fast_alpha) * self.ema_fast
+        self.ema_slow = c if i == 0 else slow_alpha * c + (1 - slow_alpha) * self.ema_slow
+        if i >= MACD_SLOW - 1:
+            macd = self.ema_fast - self.ema_slow
+            if i == MACD_SLOW - 1:
+                self.macd_signal = macd
+            else:
+                self.macd_signal = signal_alpha * macd + (1 - signal_alpha) * self.macd_signal
+            row[MACD_COL] = macd
+            if i >= MACD_SLOW + MACD_SIGNAL - 2:
+                row[MACD_COL + 1] = self.macd_signal
+                row[MACD_COL + 2] = macd - self.macd_signal
+        
+        # Bollinger Bands and close-price volatility (same 20-candle window)
+        middle = self.bb_mean.update(c)
+        volatility = self.volatility.update(c)
+        if i >= BB_WINDOW - 1:
+            band = BB_DEV * np.sqrt((BB_WINDOW - 1) / BB_WINDOW) * volatility
+            row[BB_COL] = middle + band
+            row[BB_COL + 1] = middle - band
+            row[BB_COL + 2] = middle
+            row[BB_COL + 3] = 2 * band / middle
+            if band > 0:
+                row[BB_COL + 4] = (c - middle + band) / (2 * band)
+            
+            row[VOLATILITY_COL] = volatility
+            volatility_mean = self.volatility_mean.update(volatility)
+            if volatility_mean > 0:
+                row[VOLATILITY_COL + 1] = volatility / volatility_mean
+        
+        # Stochastic oscillator
+        lowest = self.stoch_low.update(low_price)
+        highest = self.stoch_high.update(high_price)
+        if i >= STOCH_WINDOW - 1:
+            if highest > lowest:
+                row[STOCH_COL] = 100 * (c - lowest) / (highest - lowest)
+            self.stoch_k.append(row[STOCH_COL])
+            if len(self.stoch_k) == STOCH_SMOOTH:
+                row[STOCH_COL + 1] = sum(self.stoch_k) / STOCH_SMOOTH
+        
+        # Volume moving average
+        volume_sma = self.volume_mean.update(v)
+        row[VOLUME_COL] = volume_sma
+        if volume_sma > 0:
+            row[VOLUME_COL + 1] = v / volume_sma
+        
+        # Support and resistance levels
+        support = self.support.update(low_price)
+        resistance = self.resistance.update(high_price)
+        row[LEVEL_COL] = support
+        row[LEVEL_COL + 1] = resistance
+        row[LEVEL_COL + 2] = (c - support) / c
+        row[LEVEL_COL + 3] = (resistance - c) / c
+        
+        # Rolling close/volume statistics
+        for k, (close_mean, close_std, close_min, close_max, volume_mean) in enumerate(self.rolling):
+            col = ROLLING_COL + 5 * k
+            row[col] = close_mean.update(c)
+            row[col + 1] = close_std.update(c)
+            row[col + 2] = close_min.update(c)
+            row[col + 3] = close_max.update(c)
+            row[col + 4] = volume_mean.update(v)
+        
+        # Price momentum
+        self.closes.append(c)
+        for k, period in enumerate(MOMENTUM_PERIODS):
+            if len(self.closes) > period:
+                row[MOMENTUM_COL + k] = c / self.closes[-1 - period] - 1
+        
+        # Lag features
+        self.lag_sources.append((c, v, row[RSI_COL]))
+        for k, lag in enumerate(LAG_PERIODS):
+            if len(self.lag_sources) > lag:
+                row[LAG_COL + 3 * k:LAG_COL + 3 * k + 3] = self.lag_sources[-1 - lag]
+        
+        # Time-based features
+        if timestamp is not None:
+            ts = pd.Timestamp(timestamp)
+            row[len(FEATURE_COLUMNS):] = [ts.hour, ts.dayofweek, ts.day, ts.month, ts.quarter]
+        
+        self.prev_close = c
+        return row.astype(np.float32)
+
+
+class PredictionBatcher:
+    """
+    Micro-batching front end for single-row predictions
+    
+    Feature rows submitted from any thread are queued and flushed as one (B, F)
+    matrix once max_batch rows are waiting or max_delay seconds have passed since
+    the first one, so each model is called once per batch instead of once per row.
+    """
+    
+    def __init__(self, agent: 'CryptoPredictionAgent', target_horizon: int = 1,
+                 max_batch: int = 64, max_delay: float = 0.005):
+        self.agent = agent
+        self.target_horizon = target_horizon
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.Queue(maxsize=4 * max_batch)
+        self._closed = threading.Event()
+        # Held across submit's closed check and put, so nothing is queued after close()
+        self._submit_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+    
+    def submit(self, features: np.ndarray) -> Future:
+        """
+        Queue one feature row (in agent.feature_columns order); the future resolves
+        to a dict of per-model predictions plus 'ensemble'
+        """
+        # Reject malformed rows here, where they would otherwise fail every request batched with them
+        row = np.asarray(features, dtype=np.float32)
+        if row.shape != (len(self.agent.feature_columns),):
+            raise ValueError(f"Expected a row of {len(self.agent.feature_columns)} features, got shape {row.shape}")
+        
+        future = Future()
+        with self._submit_lock:
+            if self._closed.is_set():
+                raise RuntimeError("PredictionBatcher is closed")
+            self.queue.put((row, future))
+        return future
+    
+    def close(self):
+        """Stop the flush thread after serving every queued request"""
+        with self._submit_lock:
+            self._closed.set()
+        self._worker.join()
+    
+    def _run(self):
+        """Flush loop: collect up to max_batch rows or until max_delay expires"""
+        while not (self._closed.is_set() and self.queue.empty()):
+            try:
+                batch = [self.queue.get(timeout=0.05)]
+            except queue.Empty:
+                continue
+            
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            self._flush(batch)
+    
+    def _flush(self, batch: List[Tuple[np.ndarray, Future]]):
+        """Predict a batch in one call per model and fan results back to the futures"""
+        # Mark the futures as running, which drops the ones cancelled while queued
+        # and stops the rest from being cancelled mid-flush
+        batch = [(row, future) for row, future in batch if self._start(future)]
+        if not batch:
+            return
+        
+        try:
+            predictions = self.agent.predict_batch(np.stack([row for row, _ in batch]), self.target_horizon)
+        except Exception as e:
+            for _, future in batch:
+                self._resolve(future.set_exception, e)
+            return
+        
+        for i, (_, future) in enumerate(batch):
+            self._resolve(future.set_result, {name: values[i] for name, values in predictions.items()})
+    
+    def _start(self, future: Future) -> bool:
+        """Move a queued future to running; False if it was cancelled or already resolved"""
+        try:
+            return future.set_running_or_notify_cancel()
+        except RuntimeError:
+            return False
+    
+    def _resolve(self, setter, value):
+        """Set a future's outcome; one the caller already resolved must not stop the flush thread"""
+        try:
+            setter(value)
+        except InvalidStateError:
+            pass
+
+
+class SeasonalTrendModel:
+    """
+    Lightweight additive forecaster: linear trend plus a repeating seasonal profile
+    
+    A closed-form replacement for the Prophet fit on regularly spaced candles;
+    predict() returns Prophet-style ds/trend/seasonal/yhat/yhat_lower/yhat_upper
+    columns covering the history and the requested future periods.
+    """
+    
+    def __init__(self, period: int = 24, interval_z: float = 1.28):
+        self.period = period
+        self.interval_z = interval_z  # 80% interval, Prophet's default width
+        self.slope = 0.0
+        self.intercept = 0.0
+        self.profile = np.zeros(period)
+        self.sigma = 0.0
+        self.ds = None
+    
+    def fit(self, ds: pd.Series, y: np.ndarray) -> 'SeasonalTrendModel':
+        """Fit trend and seasonal profile to the series y observed at timestamps ds"""
+        self.ds = pd.DatetimeIndex(ds)
+        self.slope, self.intercept, self.profile, self.sigma = _fit_trend_seasonal(
+            np.ascontiguousarray(y, dtype=np.float64), int(self.period)
+        )
+        return self
+    
+    def predict(self, periods: int = 30, freq: str = 'h') -> pd.DataFrame:
+        """Fitted values for the history followed by `periods` future steps"""
+        future = pd.date_range(self.ds[-1], periods=periods + 1, freq=freq)[1:]
+        t = np.arange(len(self.ds) + periods)
+        trend = self.intercept + self.slope * t
+        seasonal = self.profile[t % self.period]
+        yhat = trend + seasonal
+        
+        return pd.DataFrame({
+            'ds': self.ds.append(future),
+            'trend': trend,
+            'seasonal': seasonal,
+            'yhat': yhat,
+            'yhat_lower': yhat - self.interval_z * self.sigma,
+            'yhat_upper': yhat + self.interval_z * self.sigma
+        })
+
+
 class CryptoPredictionAgent:
     """
     Advanced cryptocurrency price prediction agent using multiple ML models
@@ -27,9 +762,25 @@ class CryptoPredictionAgent:
     def __init__(self, config: Dict):
         self.config = config
         self.models = {}
-        self.scalers = {}
         self.feature_columns = []
         self.target_column = 'close'
+        self.streamers = {}
+        
+        # LRU cache of prepare_features results for the callers that pass a cache_key
+        self._feature_cache = OrderedDict()
+        self.feature_cache_size = config.get('feature_cache_size', 8)
+        
+        # Time series forecaster: 'seasonal' (built-in) or 'prophet' (needs the prophet package)
+        self.forecast_model = config.get('forecast_model', 'seasonal')
+        self.seasonal_period = config.get('seasonal_period', 24)
+        # Prophet's posterior sampling for yhat_lower/yhat_upper can be skipped when intervals aren't used
+        self.prophet_intervals = config.get('prophet_intervals', True)
+        self.n_jobs = config.get('n_jobs', N_JOBS)
+        # Training sets below `parallel_train_min` rows are fitted in this process, since spawning
+        # the model workers (seconds of imports each) outweighs the time they save on small fits
+        self.parallel_train_min = config.get('parallel_train_min', 1000)
+        # Opt-in GPU training for XGBoost, honoured only by CUDA-enabled builds
+        use_gpu = config.get('use_gpu', False) and bool(xgb.build_info().get('USE_CUDA'))
         
         # Model configurations
         self.model_configs = {
@@ -39,7 +790,12 @@ class CryptoPredictionAgent:
                 'learning_rate': 0.01,
                 'subsample': 0.8,
                 'colsample_bytree': 0.8,
-                'random_state': 42
+                'random_state': 42,
+                'n_jobs': self.n_jobs,
+                # Histogram split finding instead of the exact pre-sorted algorithm
+                'tree_method': 'hist',
+                'max_bin': 256,
+                'device': 'cuda' if use_gpu else 'cpu'
             },
             'lightgbm': {
                 'n_estimators': 1000,
@@ -48,14 +804,18 @@ class CryptoPredictionAgent:
                 'subsample': 0.8,
                 'colsample_bytree': 0.8,
                 'random_state': 42,
-                'verbose': -1
+                'verbose': -1,
+                'n_jobs': self.n_jobs,  # mapped to num_threads
+                'max_bin': 255
             },
-            'random_forest': {
-                'n_estimators': 500,
-                'max_depth': 10,
-                'random_state': 42,
-                'n_jobs': -1
+            # Binned-histogram boosting in place of a 500-tree random forest
+            'hist_gradient_boosting': {
+                'max_iter': 500,
+                'max_depth': 6,
+                'learning_rate': 0.05,
+                'random_state': 42
             },
+            # sklearn's GradientBoostingRegressor is single-threaded; no n_jobs to set
             'gradient_boosting': {
                 'n_estimators': 500,
                 'max_depth': 6,
@@ -64,9 +824,14 @@ class CryptoPredictionAgent:
             }
         }
     
-    def prepare_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def prepare_features(self, df: pd.DataFrame, cache_key: Optional[Hashable] = None) -> pd.DataFrame:
         """
         Prepare technical indicators and features for prediction
+        
+        When a cache_key is given, the result is memoized under it and repeated calls
+        with the same key return the same, shared DataFrame; treat it as read-only.
+        The key must change whenever the frame's contents do, e.g. (symbol, last
+        candle time) for a frame that is updated in place.
         """
         try:
             # Ensure we have OHLCV data
@@ -74,91 +839,63 @@ class CryptoPredictionAgent:
             if not all(col in df.columns for col in required_columns):
                 raise ValueError(f"Missing required columns: {required_columns}")
             
-            # Create a copy to avoid modifying original data
-            data = df.copy()
-            
-            # Basic price features
-            data['price_change'] = data['close'].pct_change()
-            data['price_change_abs'] = data['price_change'].abs()
-            data['high_low_ratio'] = data['high'] / data['low']
-            data['open_close_ratio'] = data['open'] / data['close']
-            
-            # Moving averages
-            for period in [7, 14, 21, 50, 100, 200]:
-                data[f'sma_{period}'] = ta.trend.sma_indicator(data['close'], window=period)
-                data[f'ema_{period}'] = ta.trend.ema_indicator(data['close'], window=period)
-            
-            # Technical indicators
-            # RSI
-            data['rsi'] = ta.momentum.rsi(data['close'], window=14)
-            
-            # MACD
-            macd = ta.trend.MACD(data['close'])
-            data['macd'] = macd.macd()
-            data['macd_signal'] = macd.macd_signal()
-            data['macd_histogram'] = macd.macd_diff()
-            
-            # Bollinger Bands
-            bb = ta.volatility.BollingerBands(data['close'])
-            data['bb_upper'] = bb.bollinger_hband()
-            data['bb_lower'] = bb.bollinger_lband()
-            data['bb_middle'] = bb.bollinger_mavg()
-            data['bb_width'] = (data['bb_upper'] - data['bb_lower']) / data['bb_middle']
-            data['bb_position'] = (data['close'] - data['bb_lower']) / (data['bb_upper'] - data['bb_lower'])
-            
-            # Stochastic Oscillator
-            stoch = ta.momentum.StochasticOscillator(data['high'], data['low'], data['close'])
-            data['stoch_k'] = stoch.stoch()
-            data['stoch_d'] = stoch.stoch_signal()
-            
-            # Volume indicators
-            data['volume_sma'] = ta.volume.volume_sma(data['close'], data['volume'], window=20)
-            data['volume_ratio'] = data['volume'] / data['volume_sma']
-            
-            # Volatility
-            data['volatility'] = data['close'].rolling(window=20).std()
-            data['volatility_ratio'] = data['volatility'] / data['volatility'].rolling(window=50).mean()
-            
-            # Price momentum
-            for period in [1, 3, 7, 14, 30]:
-                data[f'momentum_{period}'] = data['close'] / data['close'].shift(period) - 1
-            
-            # Support and resistance levels
-            data['support'] = data['low'].rolling(window=20).min()
-            data['resistance'] = data['high'].rolling(window=20).max()
-            data['support_distance'] = (data['close'] - data['support']) / data['close']
-            data['resistance_distance'] = (data['resistance'] - data['close']) / data['close']
+            # Reuse the features of a frame that was already prepared
+            if cache_key is not None and cache_key in self._feature_cache:
+                self._feature_cache.move_to_end(cache_key)
+                data, self.feature_columns = self._feature_cache[cache_key]
+                return data
+            
+            # Preallocate the float32 feature matrix for the fixed schema
+            timestamps = pd.to_datetime(df['timestamp']) if 'timestamp' in df.columns else None
+            columns = FEATURE_COLUMNS + (TIME_COLUMNS if timestamps is not None else [])
+            feat = np.empty((len(df), len(columns)), dtype=np.float32)
+            
+            # Price, trend, momentum, volatility, volume and level indicators in one fused pass
+            open_price, high_price, low_price, close_price, volume = (
+                np.ascontiguousarray(df[col], dtype=np.float64) for col in required_columns
+            )
+            _compute_indicators(open_price, high_price, low_price, close_price, volume, feat[:, :N_INDICATORS])
+            
+            # Price momentum for every period in one divide against a strided view of past closes
+            max_period = max(MOMENTUM_PERIODS)
+            padded_close = np.concatenate([np.full(max_period, np.nan), close_price])
+            shifted = sliding_window_view(padded_close, max_period + 1)[:, max_period - np.array(MOMENTUM_PERIODS)]
+            feat[:, MOMENTUM_COL:LAG_COL] = close_price[:, None] / shifted - 1.0
+            
+            # Lag features, gathered for every lag at once from a strided view
+            # over the NaN-padded close/volume/rsi columns
+            max_lag = max(LAG_PERIODS)
+            sources = np.full((len(df) + max_lag, 3), np.nan, dtype=np.float32)
+            sources[max_lag:, 0] = close_price
+            sources[max_lag:, 1] = volume
+            sources[max_lag:, 2] = feat[:, RSI_COL]
+            windows = sliding_window_view(sources, max_lag + 1, axis=0)
+            lags = windows[:, :, max_lag - np.array(LAG_PERIODS)]
+            feat[:, LAG_COL:LAG_COL + 3 * len(LAG_PERIODS)] = lags.transpose(0, 2, 1).reshape(len(df), -1)
             
             # Time-based features
-            if 'timestamp' in data.columns:
-                data['timestamp'] = pd.to_datetime(data['timestamp'])
-                data['hour'] = data['timestamp'].dt.hour
-                data['day_of_week'] = data['timestamp'].dt.dayofweek
-                data['day_of_month'] = data['timestamp'].dt.day
-                data['month'] = data['timestamp'].dt.month
-                data['quarter'] = data['timestamp'].dt.quarter
-            
-            # Lag features
-            for lag in [1, 2, 3, 5, 7]:
-                data[f'close_lag_{lag}'] = data['close'].shift(lag)
-                data[f'volume_lag_{lag}'] = data['volume'].shift(lag)
-                data[f'rsi_lag_{lag}'] = data['rsi'].shift(lag)
-            
-            # Rolling statistics
-            for window in [7, 14, 30]:
-                data[f'close_mean_{window}'] = data['close'].rolling(window=window).mean()
-                data[f'close_std_{window}'] = data['close'].rolling(window=window).std()
-                data[f'close_min_{window}'] = data['close'].rolling(window=window).min()
-                data[f'close_max_{window}'] = data['close'].rolling(window=window).max()
-                data[f'volume_mean_{window}'] = data['volume'].rolling(window=window).mean()
-            
-            # Drop rows with NaN values
-            data = data.dropna()
+            if timestamps is not None:
+                feat[:, len(FEATURE_COLUMNS):] = np.column_stack([
+                    timestamps.dt.hour, timestamps.dt.dayofweek, timestamps.dt.day,
+                    timestamps.dt.month, timestamps.dt.quarter
+                ])
+            
+            # Drop rows with NaN values in the features or the original columns
+            valid = ~np.isnan(feat).any(axis=1) & df.notna().all(axis=1).to_numpy()
+            data = df.loc[valid].drop(columns=columns, errors='ignore')
+            if timestamps is not None:
+                data['timestamp'] = timestamps[valid]
+            data = pd.concat([data, pd.DataFrame(feat[valid], index=data.index, columns=columns)], axis=1)
             
             # Store feature columns (excluding target and non-feature columns)
             exclude_columns = ['open', 'high', 'low', 'close', 'volume', 'timestamp']
             self.feature_columns = [col for col in data.columns if col not in exclude_columns]
             
+            if cache_key is not None:
+                self._feature_cache[cache_key] = (data, self.feature_columns)
+                if len(self._feature_cache) > self.feature_cache_size:
+                    self._feature_cache.popitem(last=False)
+            
             logger.info(f"Prepared {len(self.feature_columns)} features for prediction")
             return data
             
@@ -169,14 +906,18 @@ class CryptoPredictionAgent:
     def train_models(self, data: pd.DataFrame, target_horizon: int = 1) -> Dict:
         """
         Train multiple ML models for price prediction
+        
+        Training sets of parallel_train_min rows or more are fitted in spawned worker
+        processes, so scripts training on them need an `if __name__ == '__main__'` guard.
         """
         try:
-            # Prepare target variable (future price)
-            data[f'target_{target_horizon}'] = data['close'].shift(-target_horizon)
-            data = data.dropna()
+            # Prepare target variable (future price) without modifying the caller's frame
+            data = data.assign(**{f'target_{target_horizon}': data['close'].shift(-target_horizon)}).dropna()
             
-            # Split features and target
-            X = data[self.feature_columns]
+            # Split features and target. Tree models are invariant to per-feature scaling, so they
+            # train on the raw features, converted once to the C-contiguous float32 layout that
+            # XGBoost and LightGBM bin from without further copies
+            X = np.ascontiguousarray(data[self.feature_columns].to_numpy(dtype=np.float32))
             y = data[f'target_{target_horizon}']
             
             # Split into train/validation sets
@@ -184,54 +925,30 @@ class CryptoPredictionAgent:
             X_train, X_val = X[:split_idx], X[split_idx:]
             y_train, y_val = y[:split_idx], y[split_idx:]
             
-            # Scale features
-            scaler = StandardScaler()
-            X_train_scaled = scaler.fit_transform(X_train)
-            X_val_scaled = scaler.transform(X_val)
-            
-            self.scalers[target_horizon] = scaler
-            
-            # Train models
-            models = {}
-            metrics = {}
-            
-            # XGBoost
-            xgb_model = xgb.XGBRegressor(**self.model_configs['xgboost'])
-            xgb_model.fit(X_train_scaled, y_train)
-            xgb_pred = xgb_model.predict(X_val_scaled)
-            
-            models['xgboost'] = xgb_model
-            metrics['xgboost'] = self._calculate_metrics(y_val, xgb_pred)
-            
-            # LightGBM
-            lgb_model = lgb.LGBMRegressor(**self.model_configs['lightgbm'])
-            lgb_model.fit(X_train_scaled, y_train)
-            lgb_pred = lgb_model.predict(X_val_scaled)
-            
-            models['lightgbm'] = lgb_model
-            metrics['lightgbm'] = self._calculate_metrics(y_val, lgb_pred)
+            if self.n_jobs < 2 or len(X_train) < self.parallel_train_min:
+                # Fit the models one after another, each with the whole thread budget
+                fitted = {
+                    name: _fit_model(name, params, self.n_jobs, X_train, y_train, X_val)
+                    for name, params in self.model_configs.items()
+                }
+            else:
+                # Train the models concurrently, one process each, splitting the thread budget between them
+                threads = max(1, self.n_jobs // len(self.model_configs))
+                with ProcessPoolExecutor(max_workers=len(self.model_configs), mp_context=_SPAWN) as executor:
+                    futures = {
+                        name: executor.submit(_fit_model, name, params, threads, X_train, y_train, X_val)
+                        for name, params in self.model_configs.items()
+                    }
+                    fitted = {name: future.result() for name, future in futures.items()}
             
-            # Random Forest
-            rf_model = RandomForestRegressor(**self.model_configs['random_forest'])
-            rf_model.fit(X_train_scaled, y_train)
-            rf_pred = rf_model.predict(X_val_scaled)
-            
-            models['random_forest'] = rf_model
-            metrics['random_forest'] = self._calculate_metrics(y_val, rf_pred)
-            
-            # Gradient Boosting
-            gb_model = GradientBoostingRegressor(**self.model_configs['gradient_boosting'])
-            gb_model.fit(X_train_scaled, y_train)
-            gb_pred = gb_model.predict(X_val_scaled)
-            
-            models['gradient_boosting'] = gb_model
-            metrics['gradient_boosting'] = self._calculate_metrics(y_val, gb_pred)
+            models = {name: model for name, (model, _) in fitted.items()}
+            metrics = {name: self._calculate_metrics(y_val, pred) for name, (_, pred) in fitted.items()}
             
             # Store models
             self.models[target_horizon] = models
             
-            # Create ensemble prediction
-            ensemble_pred = (xgb_pred + lgb_pred + rf_pred + gb_pred) / 4
+            # Create ensemble prediction: one reduction over the stacked (models, samples) matrix
+            ensemble_pred = np.stack([pred for _, pred in fitted.values()]).mean(axis=0)
             metrics['ensemble'] = self._calculate_metrics(y_val, ensemble_pred)
             
             logger.info(f"Trained models for {target_horizon}-step prediction")
@@ -240,7 +957,7 @@ class CryptoPredictionAgent:
             return {
                 'models': models,
                 'metrics': metrics,
-                'feature_importance': self._get_feature_importance(models, X_train.columns)
+                'feature_importance': self._get_feature_importance(models, self.feature_columns)
             }
             
         except Exception as e:
@@ -255,24 +972,23 @@ class CryptoPredictionAgent:
             if target_horizon not in self.models:
                 raise ValueError(f"No trained model for horizon {target_horizon}")
             
-            # Prepare features
-            features = data[self.feature_columns].iloc[-1:].values
-            features_scaled = self.scalers[target_horizon].transform(features)
+            # Prepare features as a (1, F) row; each call has its own so concurrent predictions don't share it
+            features = data[self.feature_columns].iloc[-1:].to_numpy(dtype=np.float32)
             
             models = self.models[target_horizon]
-            predictions = {}
             
             # Get predictions from all models
-            for name, model in models.items():
-                pred = model.predict(features_scaled)[0]
-                predictions[name] = pred
+            preds = np.empty(len(models))
+            for i, model in enumerate(models.values()):
+                preds[i] = model.predict(features)[0]
             
             # Calculate ensemble prediction
-            ensemble_pred = np.mean(list(predictions.values()))
+            ensemble_pred = preds.mean()
+            predictions = dict(zip(models, preds.tolist()))
             predictions['ensemble'] = ensemble_pred
             
-            # Calculate prediction intervals (simple approach)
-            pred_std = np.std(list(predictions.values()))
+            # Calculate prediction intervals (simple approach) from the spread of the models
+            pred_std = preds.std()
             confidence_interval = {
                 'lower_95': ensemble_pred - 1.96 * pred_std,
                 'upper_95': ensemble_pred + 1.96 * pred_std,
@@ -300,44 +1016,135 @@ class CryptoPredictionAgent:
             logger.error(f"Error making prediction: {str(e)}")
             raise
     
+    def predict_batch(self, features: np.ndarray, target_horizon: int = 1) -> Dict[str, np.ndarray]:
+        """
+        Predict many feature rows at once, calling each model a single time
+        
+        features is a (B, F) matrix in feature_columns order. Returns an array of
+        B predictions per model plus their 'ensemble' mean.
+        """
+        try:
+            if target_horizon not in self.models:
+                raise ValueError(f"No trained model for horizon {target_horizon}")
+            
+            features = np.asarray(features, dtype=np.float32)
+            predictions = {name: model.predict(features) for name, model in self.models[target_horizon].items()}
+            predictions['ensemble'] = np.mean(list(predictions.values()), axis=0)
+            return predictions
+            
+        except Exception as e:
+            logger.error(f"Error making batch prediction: {str(e)}")
+            raise
+    
+    def start_stream(self, symbol: str, history: pd.DataFrame) -> FeatureStreamer:
+        """
+        Create the live feature stream for a symbol, warmed up on historical candles
+        """
+        try:
+            streamer = FeatureStreamer()
+            timestamps = history['timestamp'] if 'timestamp' in history.columns else [None] * len(history)
+            for o, h, l, c, v, ts in zip(history['open'], history['high'], history['low'],
+                                         history['close'], history['volume'], timestamps):
+                streamer.update(o, h, l, c, v, ts)
+            
+            self.streamers[symbol] = streamer
+            logger.info(f"Started feature stream for {symbol} from {len(history)} candles")
+            return streamer
+            
+        except Exception as e:
+            logger.error(f"Error starting feature stream: {str(e)}")
+            raise
+    
+    def predict_tick(self, symbol: str, candle: Dict, target_horizon: int = 1, model_type: str = 'ensemble') -> Dict:
+        """
+        Predict from a single new candle using the symbol's incremental feature stream
+        
+        Only the new candle's feature row is computed, so the cost per tick does not
+        grow with history length. The candle needs open/high/low/close/volume and,
+        if the models were trained with calendar features, a timestamp.
+        """
+        try:
+            streamer = self.streamers.get(symbol)
+            if streamer is None:
+                streamer = self.streamers[symbol] = FeatureStreamer()
+            timestamp = candle.get('timestamp')
+            row = streamer.update(candle['open'], candle['high'], candle['low'],
+                                  candle['close'], candle['volume'], timestamp)
+            
+            columns = FEATURE_COLUMNS + (TIME_COLUMNS if timestamp is not None else [])
+            data = pd.DataFrame([{**candle, **dict(zip(columns, row))}])
+            if data[self.feature_columns].isna().any(axis=None):
+                raise ValueError(f"Feature stream for {symbol} is still warming up")
+            
+            return self.predict(data, target_horizon, model_type)
+            
+        except Exception as e:
+            logger.error(f"Error making streaming prediction: {str(e)}")
+            raise
+    
     def _calculate_metrics(self, y_true: np.ndarray, y_pred: np.ndarray) -> Dict:
-        """Calculate prediction metrics"""
+        """Calculate prediction metrics from a single residual array"""
+        y_true = np.asarray(y_true, dtype=np.float64)
+        diff = y_true - y_pred
+        mse = np.mean(diff * diff)
+        variance = y_true.var()
+        
         return {
-            'mae': mean_absolute_error(y_true, y_pred),
-            'mse': mean_squared_error(y_true, y_pred),
-            'rmse': np.sqrt(mean_squared_error(y_true, y_pred)),
-            'r2': r2_score(y_true, y_pred),
-            'mape': np.mean(np.abs((y_true - y_pred) / y_true)) * 100
+            'mae': np.mean(np.abs(diff)),
+            'mse': mse,
+            'rmse': np.sqrt(mse),
+            'r2': 1 - mse / variance if variance > 0 else float(mse == 0),
+            # Zero targets are left out of MAPE instead of dividing by zero
+            'mape': np.nanmean(np.abs(diff / np.where(y_true == 0, np.nan, y_true))) * 100
         }
     
     def _get_feature_importance(self, models: Dict, feature_names: List[str]) -> Dict:
-        """Get feature importance from models"""
-        importance_dict = {}
-        
-        for name, model in models.items():
-            if hasattr(model, 'feature_importances_'):
-                importance = model.feature_importances_
-                importance_dict[name] = dict(zip(feature_names, importance))
+        """Stack the models' feature importances into one (models, features) float32 matrix"""
+        names = [name for name, model in models.items() if hasattr(model, 'feature_importances_')]
+        if names:
+            importance = np.stack([models[name].feature_importances_.astype(np.float32) for name in names])
+        else:
+            importance = np.empty((0, len(feature_names)), dtype=np.float32)
         
-        return importance_dict
+        return {'models': names, 'feature_names': list(feature_names), 'importance': importance}
+    
+    def feature_importance_by_model(self, feature_importance: Dict) -> Dict[str, Dict[str, float]]:
+        """
+        Expand the importance matrix returned by train_models into per-model
+        {feature: importance} dicts, e.g. for serialization
+        """
+        return {
+            name: dict(zip(feature_importance['feature_names'], row.tolist()))
+            for name, row in zip(feature_importance['models'], feature_importance['importance'])
+        }
     
     def train_prophet_model(self, data: pd.DataFrame, symbol: str) -> Dict:
         """
-        Train Facebook Prophet model for time series forecasting
+        Train a time series model for close-price forecasting
+        
+        Uses the closed-form SeasonalTrendModel by default; Facebook Prophet is
+        used instead when config['forecast_model'] is 'prophet' and it is installed.
         """
         try:
+            if self.forecast_model != 'prophet' or Prophet is None:
+                return self._train_seasonal_model(data, symbol)
+            
             # Prepare data for Prophet
             prophet_data = data[['timestamp', 'close']].copy()
             prophet_data.columns = ['ds', 'y']
             prophet_data['ds'] = pd.to_datetime(prophet_data['ds'])
             
-            # Initialize and fit Prophet model
+            # Initialize and fit Prophet model. Yearly seasonality is not identifiable from
+            # the months of candles available, and low Fourier orders suffice for the
+            # daily and weekly cycles
             model = Prophet(
-                daily_seasonality=True,
-                weekly_seasonality=True,
-                yearly_seasonality=True,
+                daily_seasonality=4,
+                weekly_seasonality=3,
+                yearly_seasonality=False,
                 changepoint_prior_scale=0.05,
-                seasonality_prior_scale=10.0
+                seasonality_prior_scale=10.0,
+                mcmc_samples=0,
+                uncertainty_samples=1000 if self.prophet_intervals else 0
             )
             
             # Add custom regressors if available
@@ -348,7 +1155,7 @@ class CryptoPredictionAgent:
             model.fit(prophet_data)
             
             # Make future predictions
-            future = model.make_future_dataframe(periods=30, freq='H')
+            future = model.make_future_dataframe(periods=30, freq='h')
             if 'volume' in prophet_data.columns:
                 # Use last known volume for future predictions
                 future['volume'] = prophet_data['volume'].iloc[-1]
@@ -358,21 +1165,48 @@ class CryptoPredictionAgent:
             # Store model
             self.models[f'prophet_{symbol}'] = model
             
+            # Components come from the same forecast rather than a second predict pass
+            seasonal_columns = [col for col in ('daily', 'weekly', 'yearly') if col in forecast.columns]
+            component_columns = [col for col in ('ds', 'yhat', 'yhat_lower', 'yhat_upper', 'trend') if col in forecast.columns]
+            components = forecast[component_columns].assign(
+                seasonal=forecast[seasonal_columns].sum(axis=1)
+            )
+            
             return {
                 'model': model,
                 'forecast': forecast,
-                'components': model.predict(future)[['ds', 'yhat', 'yhat_lower', 'yhat_upper', 'trend', 'seasonal']]
+                'components': components
             }
             
         except Exception as e:
             logger.error(f"Error training Prophet model: {str(e)}")
             raise
     
-    def get_prediction_summary(self, symbol: str, timeframes: List[int] = [1, 6, 24, 168]) -> Dict:
+    def _train_seasonal_model(self, data: pd.DataFrame, symbol: str) -> Dict:
+        """Fit the built-in trend + seasonal forecaster in place of Prophet"""
+        model = SeasonalTrendModel(period=self.seasonal_period).fit(
+            pd.to_datetime(data['timestamp']), data['close'].to_numpy(dtype=np.float64)
+        )
+        forecast = model.predict(periods=30, freq='h')
+        
+        self.models[f'seasonal_{symbol}'] = model
+        
+        return {
+            'model': model,
+            'forecast': forecast,
+            'components': forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper', 'trend', 'seasonal']]
+        }
+    
+    def get_prediction_summary(self, symbol: str, data: pd.DataFrame, timeframes: List[int] = [1, 6, 24, 168]) -> Dict:
         """
         Get comprehensive prediction summary for multiple timeframes
+        
+        data holds the raw OHLCV candles; features are prepared once and shared by
+        every horizon.
         """
         try:
+            features = self.prepare_features(data)
+            
             summary = {
                 'symbol': symbol,
                 'timestamp': datetime.now().isoformat(),
@@ -384,7 +1218,7 @@ class CryptoPredictionAgent:
             for horizon in timeframes:
                 if horizon in self.models:
                     # Get prediction for this timeframe
-                    pred_result = self.predict(data, horizon)
+                    pred_result = self.predict(features, horizon)
                     summary['predictions'][f'{horizon}h'] = pred_result
                     
                     # Calculate confidence score based on model agreement
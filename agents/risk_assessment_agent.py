@@ -6,17 +6,166 @@ Provides comprehensive risk analysis for cryptocurrency investments
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 import logging
-from scipy import stats
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
+from collections import OrderedDict
+from dataclasses import dataclass
+from operator import itemgetter
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    # Optional JIT compiler for the drawdown and downside-deviation kernels
+    import numba
+except ImportError:
+    numba = None
+
 logger = logging.getLogger(__name__)
 
+# Assumed market daily volatility used as the beta reference
+MARKET_VOLATILITY = 0.02
+
+# Return std below which a series is treated as flat (stablecoins, stale prices): ratios that
+# divide by the std are reported as 0 instead of amplifying rounding noise
+FLAT_RETURNS_STD = 1e-12
+
+# Weights of the volatility, VaR, correlation and stress-test scores in the overall risk score
+RISK_SCORE_WEIGHTS = np.array([0.3, 0.25, 0.2, 0.25])
+
+
+def _max_drawdown(returns):
+    """
+    Maximum drawdown of the compounded returns in a single pass, tracking the
+    running peak instead of materializing the cumulative and peak series.
+    """
+    cumulative = 1.0
+    peak = -np.inf
+    worst = 0.0
+    
+    for r in returns:
+        cumulative *= 1.0 + r
+        peak = max(peak, cumulative)
+        drawdown = (cumulative - peak) / peak
+        if np.isnan(drawdown):
+            return np.nan
+        worst = min(worst, drawdown)
+    
+    return abs(worst)
+
+
+def _downside_std(returns):
+    """Population std of the negative returns, or of all returns when none are negative"""
+    count = 0
+    total = 0.0
+    for r in returns:
+        if r < 0:
+            count += 1
+            total += r
+    
+    if count == 0:
+        return np.std(returns)
+    
+    mean = total / count
+    m2 = 0.0
+    for r in returns:
+        if r < 0:
+            m2 += (r - mean) * (r - mean)
+    
+    return np.sqrt(m2 / count)
+
+
+if numba is not None:
+    # Compiled eagerly so the on-disk cache is loaded at import rather than on the first assessment
+    _returns = numba.types.Array(numba.float64, 1, 'A', readonly=True)
+    _max_drawdown = numba.njit(numba.float64(_returns), cache=True, error_model='numpy')(_max_drawdown)
+    _downside_std = numba.njit(numba.float64(_returns), cache=True, error_model='numpy')(_downside_std)
+else:
+    # Interpreted, the loops above cost a Python step per return, so the vectorized forms are used instead
+    def _max_drawdown(returns):
+        """Maximum drawdown of the compounded returns"""
+        cumulative = np.cumprod(1 + returns)
+        running_max = np.maximum.accumulate(cumulative)
+        return abs(np.min((cumulative - running_max) / running_max))
+    
+    def _downside_std(returns):
+        """Population std of the negative returns, or of all returns when none are negative"""
+        downside_returns = returns[returns < 0]
+        return np.std(downside_returns) if len(downside_returns) > 0 else np.std(returns)
+
+
+@dataclass
+class AssetStats:
+    """Return statistics of a single asset, derived together from its price history"""
+    returns: np.ndarray
+    mean: float
+    std: float
+    volatility: float
+    max_drawdown: float
+    sharpe_ratio: float
+    beta: float
+
+
+@dataclass
+class PortfolioView:
+    """Portfolio holdings as parallel arrays, one entry per holding"""
+    symbols: List[str]
+    quantities: np.ndarray
+    prices: np.ndarray
+    values: np.ndarray
+    weights: np.ndarray
+    total_value: float
+
+
+class _RollingCovariance:
+    """
+    Covariance of a sliding window of return rows, kept as running sums.
+    
+    When the window has advanced by k rows since the last update, only the k rows that
+    left and the k that entered are folded into the sums; the sums are rebuilt from
+    scratch once a full window of rows has been folded in, which bounds rounding drift.
+    """
+    
+    def __init__(self, returns: np.ndarray):
+        self.reset(returns)
+    
+    def reset(self, returns: np.ndarray):
+        self.window = returns.copy()
+        self.sum_x = returns.sum(axis=0)
+        self.sum_xx = returns.T @ returns
+        self.folded = 0
+    
+    def update(self, returns: np.ndarray):
+        n = len(returns)
+        if np.array_equal(returns, self.window):
+            return
+        
+        # Find the smallest shift k for which the new window continues the previous one
+        last_row = self.window[-1]
+        for j in np.flatnonzero((returns == last_row).all(axis=1))[::-1]:
+            k = n - 1 - j
+            if 0 < k < n and np.array_equal(returns[:j + 1], self.window[k:]):
+                break
+        else:
+            self.reset(returns)
+            return
+        
+        if self.folded + k >= n:
+            self.reset(returns)
+            return
+        
+        outgoing, incoming = self.window[:k], returns[j + 1:]
+        self.sum_x += incoming.sum(axis=0) - outgoing.sum(axis=0)
+        self.sum_xx += incoming.T @ incoming - outgoing.T @ outgoing
+        self.window = returns.copy()
+        self.folded += k
+    
+    def covariance(self) -> np.ndarray:
+        n = len(self.window)
+        mean = self.sum_x / n
+        return (self.sum_xx - n * np.outer(mean, mean)) / (n - 1)
+
+
 class RiskAssessmentAgent:
     """
     Advanced risk assessment for cryptocurrency portfolios and individual assets
@@ -42,15 +191,32 @@ class RiskAssessmentAgent:
             'high': 0.8,
             'very_high': 1.0
         }
+        
+        # Price and return arrays parsed from the price lists that carry a 'cache_key', most recent last
+        self._price_cache = OrderedDict()
+        self.price_cache_size = config.get('price_cache_size', 256)
+        
+        # Running return covariances per (symbols, window length); the window is the aligned
+        # history of the assets, optionally capped at `correlation_lookback` periods
+        self._cov_cache = OrderedDict()
+        self.cov_cache_size = config.get('cov_cache_size', 32)
+        self.correlation_lookback = config.get('correlation_lookback')
+        
+        # Report the correlation matrix as nested {symbol: {symbol: value}} dicts instead of
+        # the compact {'symbols', 'values'} form
+        self.verbose_correlation_matrix = config.get('verbose_correlation_matrix', False)
     
     def assess_portfolio_risk(self, portfolio: Dict, price_data: Dict) -> Dict:
         """
         Comprehensive portfolio risk assessment
         """
         try:
+            # One timestamp for the whole assessment tree
+            timestamp = datetime.now().isoformat()
+            
             risk_assessment = {
                 'portfolio_id': portfolio.get('id', 'unknown'),
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp,
                 'total_value_usd': 0,
                 'risk_metrics': {},
                 'asset_risks': {},
@@ -64,24 +230,28 @@ class RiskAssessmentAgent:
             
             # Calculate portfolio value and weights
             portfolio_data = self._prepare_portfolio_data(portfolio, price_data)
-            risk_assessment['total_value_usd'] = portfolio_data['total_value']
+            risk_assessment['total_value_usd'] = portfolio_data.total_value
+            
+            # Asset and portfolio returns, shared by every analysis below
+            returns_map = self._returns_map(portfolio_data, price_data)
+            portfolio_returns = self._calculate_portfolio_returns(portfolio_data, returns_map)
             
             # Individual asset risk analysis
-            for asset in portfolio_data['assets']:
-                asset_risk = self._assess_asset_risk(asset, price_data.get(asset['symbol'], {}))
-                risk_assessment['asset_risks'][asset['symbol']] = asset_risk
+            for symbol, weight in zip(portfolio_data.symbols, portfolio_data.weights.tolist()):
+                asset_risk = self._assess_asset_risk(symbol, weight, returns_map[symbol])
+                risk_assessment['asset_risks'][symbol] = asset_risk
             
             # Portfolio-level risk metrics
-            risk_assessment['risk_metrics'] = self._calculate_portfolio_risk_metrics(portfolio_data, price_data)
+            risk_assessment['risk_metrics'] = self._calculate_portfolio_risk_metrics(portfolio_returns)
             
             # Correlation analysis
-            risk_assessment['correlation_analysis'] = self._analyze_portfolio_correlations(portfolio_data, price_data)
+            risk_assessment['correlation_analysis'] = self._analyze_portfolio_correlations(portfolio_data, returns_map)
             
             # Value at Risk (VaR) analysis
-            risk_assessment['var_analysis'] = self._calculate_var(portfolio_data, price_data)
+            risk_assessment['var_analysis'] = self._calculate_var(portfolio_data, portfolio_returns, timestamp)
             
             # Stress testing
-            risk_assessment['stress_test_results'] = self._perform_stress_tests(portfolio_data, price_data)
+            risk_assessment['stress_test_results'] = self._perform_stress_tests(portfolio_data, timestamp)
             
             # Overall risk score and level
             risk_score = self._calculate_overall_risk_score(risk_assessment)
@@ -141,184 +311,102 @@ class RiskAssessmentAgent:
             logger.error(f"Error assessing asset risk for {symbol}: {str(e)}")
             return {'error': str(e)}
     
-    def calculate_var(self, portfolio: Dict, price_data: Dict, confidence_levels: List[float] = [0.95, 0.99]) -> Dict:
+    def calculate_var(self, portfolio: Union[Dict, PortfolioView], price_data: Dict, confidence_levels: List[float] = [0.95, 0.99]) -> Dict:
         """
         Calculate Value at Risk (VaR) for portfolio
         """
         try:
-            var_results = {
-                'timestamp': datetime.now().isoformat(),
-                'confidence_levels': confidence_levels,
-                'var_estimates': {},
-                'expected_shortfall': {},
-                'methodology': 'historical_simulation'
-            }
-            
-            # Prepare portfolio returns
-            portfolio_returns = self._calculate_portfolio_returns(portfolio, price_data)
-            
-            if len(portfolio_returns) < 30:
-                return {'error': 'Insufficient data for VaR calculation'}
-            
-            # Calculate VaR for each confidence level
-            for confidence in confidence_levels:
-                # Historical VaR
-                var_percentile = (1 - confidence) * 100
-                var_value = np.percentile(portfolio_returns, var_percentile)
-                
-                # Expected Shortfall (Conditional VaR)
-                tail_returns = portfolio_returns[portfolio_returns <= var_value]
-                expected_shortfall = np.mean(tail_returns) if len(tail_returns) > 0 else var_value
-                
-                var_results['var_estimates'][f'{confidence:.0%}'] = {
-                    'var_absolute': var_value,
-                    'var_percentage': var_value * 100,
-                    'var_dollar': var_value * portfolio.get('total_value', 0)
-                }
-                
-                var_results['expected_shortfall'][f'{confidence:.0%}'] = {
-                    'es_absolute': expected_shortfall,
-                    'es_percentage': expected_shortfall * 100,
-                    'es_dollar': expected_shortfall * portfolio.get('total_value', 0)
-                }
-            
-            # Parametric VaR (assuming normal distribution)
-            returns_mean = np.mean(portfolio_returns)
-            returns_std = np.std(portfolio_returns)
-            
-            var_results['parametric_var'] = {}
-            for confidence in confidence_levels:
-                z_score = stats.norm.ppf(1 - confidence)
-                parametric_var = returns_mean + z_score * returns_std
-                
-                var_results['parametric_var'][f'{confidence:.0%}'] = {
-                    'var_absolute': parametric_var,
-                    'var_percentage': parametric_var * 100
-                }
-            
-            return var_results
+            portfolio_data = self._as_portfolio_view(portfolio, price_data)
+            portfolio_returns = self._calculate_portfolio_returns(
+                portfolio_data, self._returns_map(portfolio_data, price_data)
+            )
+            return self._calculate_var(portfolio_data, portfolio_returns, datetime.now().isoformat(), confidence_levels)
             
         except Exception as e:
             logger.error(f"Error calculating VaR: {str(e)}")
             return {'error': str(e)}
     
-    def perform_stress_test(self, portfolio: Dict, price_data: Dict, scenarios: List[Dict] = None) -> Dict:
+    def perform_stress_test(self, portfolio: Union[Dict, PortfolioView], price_data: Dict, scenarios: List[Dict] = None) -> Dict:
         """
         Perform stress testing on portfolio
         """
         try:
-            if scenarios is None:
-                scenarios = self._get_default_stress_scenarios()
-            
-            stress_results = {
-                'timestamp': datetime.now().isoformat(),
-                'scenarios': {},
-                'worst_case_scenario': {},
-                'portfolio_resilience_score': 0.0
-            }
-            
-            portfolio_value = portfolio.get('total_value', 0)
-            
-            for scenario in scenarios:
-                scenario_name = scenario['name']
-                scenario_shocks = scenario['shocks']
-                
-                # Apply shocks to portfolio
-                scenario_result = self._apply_stress_scenario(portfolio, scenario_shocks, price_data)
-                
-                stress_results['scenarios'][scenario_name] = {
-                    'description': scenario.get('description', ''),
-                    'portfolio_value_before': portfolio_value,
-                    'portfolio_value_after': scenario_result['new_value'],
-                    'absolute_loss': portfolio_value - scenario_result['new_value'],
-                    'percentage_loss': ((portfolio_value - scenario_result['new_value']) / portfolio_value) * 100,
-                    'asset_impacts': scenario_result['asset_impacts']
-                }
-            
-            # Find worst case scenario
-            worst_scenario = min(
-                stress_results['scenarios'].items(),
-                key=lambda x: x[1]['portfolio_value_after']
-            )
-            stress_results['worst_case_scenario'] = {
-                'scenario_name': worst_scenario[0],
-                'details': worst_scenario[1]
-            }
-            
-            # Calculate portfolio resilience score
-            avg_loss = np.mean([s['percentage_loss'] for s in stress_results['scenarios'].values()])
-            resilience_score = max(0, 100 - avg_loss)  # Higher score = more resilient
-            stress_results['portfolio_resilience_score'] = resilience_score
-            
-            return stress_results
+            portfolio_data = self._as_portfolio_view(portfolio, price_data)
+            return self._perform_stress_tests(portfolio_data, datetime.now().isoformat(), scenarios)
             
         except Exception as e:
             logger.error(f"Error performing stress test: {str(e)}")
             return {'error': str(e)}
     
-    def _prepare_portfolio_data(self, portfolio: Dict, price_data: Dict) -> Dict:
+    def _prepare_portfolio_data(self, portfolio: Dict, price_data: Dict) -> PortfolioView:
         """Prepare portfolio data for analysis"""
-        assets = []
-        total_value = 0
-        
-        for holding in portfolio.get('holdings', []):
-            symbol = holding['symbol']
-            quantity = holding['quantity']
-            current_price = price_data.get(symbol, {}).get('current_price', 0)
-            
-            asset_value = quantity * current_price
-            total_value += asset_value
-            
-            assets.append({
-                'symbol': symbol,
-                'quantity': quantity,
-                'current_price': current_price,
-                'value': asset_value,
-                'weight': 0  # Will be calculated after total_value is known
-            })
-        
-        # Calculate weights
-        for asset in assets:
-            asset['weight'] = asset['value'] / total_value if total_value > 0 else 0
-        
-        return {
-            'assets': assets,
-            'total_value': total_value,
-            'asset_count': len(assets)
-        }
+        holdings = portfolio.get('holdings', [])
+        symbols = [holding['symbol'] for holding in holdings]
+        quantities = np.array([holding['quantity'] for holding in holdings], dtype=np.float64)
+        prices = np.array(
+            [price_data.get(symbol, {}).get('current_price', 0) for symbol in symbols], dtype=np.float64
+        )
+        
+        values = quantities * prices
+        total_value = float(values.sum())
+        weights = values / total_value if total_value > 0 else np.zeros_like(values)
+        
+        return PortfolioView(
+            symbols=symbols,
+            quantities=quantities,
+            prices=prices,
+            values=values,
+            weights=weights,
+            total_value=total_value
+        )
     
-    def _assess_asset_risk(self, asset: Dict, price_data: Dict) -> Dict:
+    def _as_portfolio_view(self, portfolio: Union[Dict, PortfolioView], price_data: Dict) -> PortfolioView:
+        """Accept either prepared portfolio data or a raw portfolio with holdings"""
+        if isinstance(portfolio, PortfolioView):
+            return portfolio
+        return self._prepare_portfolio_data(portfolio, price_data)
+    
+    def _assess_asset_risk(self, symbol: str, weight: float, returns: np.ndarray) -> Dict:
         """Assess risk for individual asset"""
+        asset_stats = self._asset_stats(returns)
         return {
-            'symbol': asset['symbol'],
-            'weight': asset['weight'],
-            'volatility': self._calculate_volatility(price_data),
-            'max_drawdown': self._calculate_max_drawdown(price_data),
-            'beta': self._calculate_beta(price_data),
-            'sharpe_ratio': self._calculate_sharpe_ratio(price_data),
-            'risk_contribution': asset['weight'] * self._calculate_volatility(price_data)
+            'symbol': symbol,
+            'weight': weight,
+            'volatility': asset_stats.volatility,
+            'max_drawdown': asset_stats.max_drawdown,
+            'beta': asset_stats.beta,
+            'sharpe_ratio': asset_stats.sharpe_ratio,
+            'risk_contribution': weight * asset_stats.volatility
         }
     
-    def _calculate_portfolio_risk_metrics(self, portfolio_data: Dict, price_data: Dict) -> Dict:
+    def _calculate_portfolio_risk_metrics(self, portfolio_returns: np.ndarray) -> Dict:
         """Calculate portfolio-level risk metrics"""
         try:
-            # Portfolio returns
-            portfolio_returns = self._calculate_portfolio_returns(portfolio_data, price_data)
-            
             if len(portfolio_returns) == 0:
                 return {'error': 'No return data available'}
             
-            # Basic statistics
+            # Basic statistics from the central moments (biased skewness and excess kurtosis, as scipy.stats)
             returns_mean = np.mean(portfolio_returns)
-            returns_std = np.std(portfolio_returns)
-            returns_skew = stats.skew(portfolio_returns)
-            returns_kurtosis = stats.kurtosis(portfolio_returns)
+            deviations = portfolio_returns - returns_mean
+            squared = deviations * deviations
+            m2 = squared.mean()
+            m3 = (squared * deviations).mean()
+            m4 = (squared * squared).mean()
+            returns_std = np.sqrt(m2)
+            returns_skew = m3 / m2**1.5
+            returns_kurtosis = m4 / m2**2 - 3
             
             # Risk metrics
-            sharpe_ratio = (returns_mean - self.risk_free_rate/365) / returns_std if returns_std > 0 else 0
-            sortino_ratio = self._calculate_sortino_ratio(portfolio_returns)
+            if returns_std < FLAT_RETURNS_STD:
+                sharpe_ratio = sortino_ratio = 0.0
+            else:
+                sharpe_ratio = (returns_mean - self.risk_free_rate/365) / returns_std
+                sortino_ratio = self._calculate_sortino_ratio(portfolio_returns)
             max_drawdown = self._calculate_portfolio_max_drawdown(portfolio_returns)
             
+            # Historical VaR at 95% and 99% in one quantile pass
+            var_95, var_99 = np.percentile(portfolio_returns, [5, 1])
+            
             # Volatility metrics
             daily_volatility = returns_std
             annual_volatility = returns_std * np.sqrt(365)
@@ -332,18 +420,18 @@ class RiskAssessmentAgent:
                 'max_drawdown': max_drawdown,
                 'skewness': returns_skew,
                 'kurtosis': returns_kurtosis,
-                'var_95': np.percentile(portfolio_returns, 5),
-                'var_99': np.percentile(portfolio_returns, 1)
+                'var_95': var_95,
+                'var_99': var_99
             }
             
         except Exception as e:
             logger.error(f"Error calculating portfolio risk metrics: {str(e)}")
             return {'error': str(e)}
     
-    def _analyze_portfolio_correlations(self, portfolio_data: Dict, price_data: Dict) -> Dict:
+    def _analyze_portfolio_correlations(self, portfolio_data: PortfolioView, returns_map: Dict[str, np.ndarray]) -> Dict:
         """Analyze correlations between portfolio assets"""
         try:
-            symbols = [asset['symbol'] for asset in portfolio_data['assets']]
+            symbols = portfolio_data.symbols
             
             if len(symbols) < 2:
                 return {'message': 'Need at least 2 assets for correlation analysis'}
@@ -353,92 +441,208 @@ class RiskAssessmentAgent:
             min_length = float('inf')
             
             for symbol in symbols:
-                returns = self._calculate_returns(price_data.get(symbol, {}))
+                returns = returns_map[symbol]
                 if len(returns) > 0:
                     returns_data[symbol] = returns
                     min_length = min(min_length, len(returns))
             
+            if self.correlation_lookback:
+                min_length = min(min_length, self.correlation_lookback)
+            
             if len(returns_data) < 2 or min_length < 10:
                 return {'error': 'Insufficient data for correlation analysis'}
             
-            # Align return series
-            aligned_returns = {}
-            for symbol, returns in returns_data.items():
-                aligned_returns[symbol] = returns[-min_length:]
+            # Align return series as the columns of one (periods x assets) matrix
+            return_symbols = list(returns_data)
+            returns_matrix = np.column_stack([returns[-min_length:] for returns in returns_data.values()])
             
-            # Calculate correlation matrix
-            returns_df = pd.DataFrame(aligned_returns)
-            correlation_matrix = returns_df.corr()
+            # Calculate covariance and correlation matrices
+            cov_matrix = self._rolling_covariance(tuple(return_symbols), returns_matrix)
+            asset_std = np.sqrt(np.diag(cov_matrix))
+            correlations = cov_matrix / np.outer(asset_std, asset_std)
             
             # Calculate portfolio diversification metrics
-            avg_correlation = correlation_matrix.values[np.triu_indices_from(correlation_matrix.values, k=1)].mean()
-            max_correlation = correlation_matrix.values[np.triu_indices_from(correlation_matrix.values, k=1)].max()
-            min_correlation = correlation_matrix.values[np.triu_indices_from(correlation_matrix.values, k=1)].min()
-            
-            # Diversification ratio
-            weights = np.array([asset['weight'] for asset in portfolio_data['assets'] if asset['symbol'] in symbols])
-            portfolio_volatility = self._calculate_portfolio_volatility(weights, correlation_matrix, returns_df)
-            weighted_avg_volatility = sum(weights[i] * returns_df.iloc[:, i].std() for i in range(len(weights)))
+            pair_correlations = correlations[np.triu_indices_from(correlations, k=1)]
+            avg_correlation = pair_correlations.mean()
+            max_correlation = pair_correlations.max()
+            min_correlation = pair_correlations.min()
+            
+            # Diversification ratio, with the holdings' weights summed onto the matrix columns
+            column_index = {symbol: k for k, symbol in enumerate(return_symbols)}
+            held = [k for k, symbol in enumerate(symbols) if symbol in column_index]
+            weights = np.bincount(
+                [column_index[symbols[k]] for k in held], weights=portfolio_data.weights[held],
+                minlength=len(return_symbols)
+            )
+            portfolio_volatility = self._calculate_portfolio_volatility(weights, returns_matrix)
+            weighted_avg_volatility = float(weights @ asset_std)
             diversification_ratio = weighted_avg_volatility / portfolio_volatility if portfolio_volatility > 0 else 1
             
+            if self.verbose_correlation_matrix:
+                correlation_matrix = pd.DataFrame(correlations, index=return_symbols, columns=return_symbols).to_dict()
+            else:
+                correlation_matrix = {'symbols': return_symbols, 'values': correlations.tolist()}
+            
             return {
-                'correlation_matrix': correlation_matrix.to_dict(),
+                'correlation_matrix': correlation_matrix,
                 'average_correlation': avg_correlation,
                 'max_correlation': max_correlation,
                 'min_correlation': min_correlation,
                 'diversification_ratio': diversification_ratio,
                 'diversification_level': self._categorize_diversification(avg_correlation),
-                'highly_correlated_pairs': self._find_highly_correlated_pairs(correlation_matrix)
+                'highly_correlated_pairs': self._find_highly_correlated_pairs(correlations, return_symbols)
             }
             
         except Exception as e:
             logger.error(f"Error analyzing correlations: {str(e)}")
             return {'error': str(e)}
     
-    def _calculate_var(self, portfolio_data: Dict, price_data: Dict) -> Dict:
-        """Calculate Value at Risk for portfolio"""
-        return self.calculate_var(portfolio_data, price_data)
+    def _calculate_var(self, portfolio_data: PortfolioView, portfolio_returns: np.ndarray, timestamp: str,
+                       confidence_levels: List[float] = [0.95, 0.99]) -> Dict:
+        """Calculate Value at Risk for portfolio from its returns"""
+        try:
+            var_results = {
+                'timestamp': timestamp,
+                'confidence_levels': confidence_levels,
+                'var_estimates': {},
+                'expected_shortfall': {},
+                'methodology': 'historical_simulation'
+            }
+            
+            if len(portfolio_returns) < 30:
+                return {'error': 'Insufficient data for VaR calculation'}
+            
+            tail_probabilities = 1 - np.asarray(confidence_levels, dtype=np.float64)
+            
+            # Historical VaR for all confidence levels in one quantile call
+            sorted_returns = np.sort(portfolio_returns)
+            var_values = np.quantile(sorted_returns, tail_probabilities)
+            
+            # Expected Shortfall (Conditional VaR): each tail is a prefix of the sorted returns,
+            # so its mean is a lookup into the running sums
+            tail_counts = np.searchsorted(sorted_returns, var_values, side='right')
+            tail_sums = np.concatenate(([0.0], np.cumsum(sorted_returns)))
+            expected_shortfalls = np.where(
+                tail_counts > 0, tail_sums[tail_counts] / np.maximum(tail_counts, 1), var_values
+            )
+            
+            # Parametric VaR (assuming normal distribution); scipy is only loaded once VaR is needed
+            from scipy import stats
+            returns_mean = np.mean(portfolio_returns)
+            returns_std = np.std(portfolio_returns)
+            parametric_vars = returns_mean + stats.norm.ppf(tail_probabilities) * returns_std
+            
+            var_results['parametric_var'] = {}
+            for confidence, var_value, expected_shortfall, parametric_var in zip(
+                confidence_levels, var_values, expected_shortfalls, parametric_vars
+            ):
+                var_results['var_estimates'][f'{confidence:.0%}'] = {
+                    'var_absolute': var_value,
+                    'var_percentage': var_value * 100,
+                    'var_dollar': var_value * portfolio_data.total_value
+                }
+                
+                var_results['expected_shortfall'][f'{confidence:.0%}'] = {
+                    'es_absolute': expected_shortfall,
+                    'es_percentage': expected_shortfall * 100,
+                    'es_dollar': expected_shortfall * portfolio_data.total_value
+                }
+                
+                var_results['parametric_var'][f'{confidence:.0%}'] = {
+                    'var_absolute': parametric_var,
+                    'var_percentage': parametric_var * 100
+                }
+            
+            return var_results
+            
+        except Exception as e:
+            logger.error(f"Error calculating VaR: {str(e)}")
+            return {'error': str(e)}
     
-    def _perform_stress_tests(self, portfolio_data: Dict, price_data: Dict) -> Dict:
+    def _perform_stress_tests(self, portfolio_data: PortfolioView, timestamp: str, scenarios: List[Dict] = None) -> Dict:
         """Perform stress tests on portfolio"""
-        return self.perform_stress_test(portfolio_data, price_data)
+        try:
+            if scenarios is None:
+                scenarios = self._get_default_stress_scenarios()
+            
+            stress_results = {
+                'timestamp': timestamp,
+                'scenarios': {},
+                'worst_case_scenario': {},
+                'portfolio_resilience_score': 0.0
+            }
+            
+            portfolio_value = portfolio_data.total_value
+            scenario_names = []
+            new_values = np.empty(len(scenarios))
+            losses = np.empty(len(scenarios))
+            
+            for i, scenario in enumerate(scenarios):
+                scenario_name = scenario['name']
+                scenario_shocks = scenario['shocks']
+                
+                # Apply shocks to portfolio
+                scenario_result = self._apply_stress_scenario(portfolio_data, scenario_shocks)
+                new_value = scenario_result['new_value']
+                absolute_loss = portfolio_value - new_value
+                percentage_loss = (absolute_loss / portfolio_value) * 100
+                
+                scenario_names.append(scenario_name)
+                new_values[i] = new_value
+                losses[i] = percentage_loss
+                
+                stress_results['scenarios'][scenario_name] = {
+                    'description': scenario.get('description', ''),
+                    'portfolio_value_before': portfolio_value,
+                    'portfolio_value_after': new_value,
+                    'absolute_loss': absolute_loss,
+                    'percentage_loss': percentage_loss,
+                    'asset_impacts': scenario_result['asset_impacts']
+                }
+            
+            # Find worst case scenario, the first one with the lowest value after the shocks
+            worst_name = scenario_names[int(new_values.argmin())]
+            stress_results['worst_case_scenario'] = {
+                'scenario_name': worst_name,
+                'details': stress_results['scenarios'][worst_name]
+            }
+            
+            # Calculate portfolio resilience score
+            avg_loss = losses.mean()
+            resilience_score = max(0, 100 - avg_loss)  # Higher score = more resilient
+            stress_results['portfolio_resilience_score'] = resilience_score
+            
+            return stress_results
+            
+        except Exception as e:
+            logger.error(f"Error performing stress test: {str(e)}")
+            return {'error': str(e)}
     
     def _calculate_overall_risk_score(self, risk_assessment: Dict) -> float:
         """Calculate overall risk score (0-100, higher = riskier)"""
         try:
-            scores = []
-            weights = []
-            
-            # Volatility score (30% weight)
-            volatility = risk_assessment.get('risk_metrics', {}).get('annual_volatility', 0)
-            volatility_score = min(100, volatility * 100)  # Convert to percentage
-            scores.append(volatility_score)
-            weights.append(0.3)
-            
-            # VaR score (25% weight)
-            var_95 = abs(risk_assessment.get('var_analysis', {}).get('var_estimates', {}).get('95%', {}).get('var_percentage', 0))
-            var_score = min(100, var_95)
-            scores.append(var_score)
-            weights.append(0.25)
-            
-            # Correlation score (20% weight)
-            avg_correlation = risk_assessment.get('correlation_analysis', {}).get('average_correlation', 0)
-            correlation_score = abs(avg_correlation) * 100
-            scores.append(correlation_score)
-            weights.append(0.2)
-            
-            # Stress test score (25% weight)
-            resilience_score = risk_assessment.get('stress_test_results', {}).get('portfolio_resilience_score', 50)
-            stress_score = 100 - resilience_score  # Invert so higher = riskier
-            scores.append(stress_score)
-            weights.append(0.25)
-            
-            # Calculate weighted average
-            if scores and weights:
-                overall_score = np.average(scores, weights=weights)
-                return min(100, max(0, overall_score))
-            
-            return 50.0  # Default medium risk
+            risk_metrics = risk_assessment.get('risk_metrics') or {}
+            var_estimates = (risk_assessment.get('var_analysis') or {}).get('var_estimates') or {}
+            var_estimate_95 = var_estimates.get('95%') or {}
+            correlation_analysis = risk_assessment.get('correlation_analysis') or {}
+            stress_test_results = risk_assessment.get('stress_test_results') or {}
+            
+            # Volatility score, converted to percentage
+            volatility_score = min(100, risk_metrics.get('annual_volatility', 0) * 100)
+            
+            # VaR score
+            var_score = min(100, abs(var_estimate_95.get('var_percentage', 0)))
+            
+            # Correlation score
+            correlation_score = abs(correlation_analysis.get('average_correlation', 0)) * 100
+            
+            # Stress test score, inverted so higher = riskier
+            stress_score = 100 - stress_test_results.get('portfolio_resilience_score', 50)
+            
+            # Weighted average of the component scores
+            scores = np.array([volatility_score, var_score, correlation_score, stress_score], dtype=np.float64)
+            overall_score = np.average(scores, weights=RISK_SCORE_WEIGHTS)
+            return min(100, max(0, overall_score))
             
         except Exception as e:
             logger.error(f"Error calculating overall risk score: {str(e)}")
@@ -499,58 +703,70 @@ class RiskAssessmentAgent:
         
         return recommendations if recommendations else ["Portfolio risk appears to be within acceptable levels"]
     
-    def _calculate_returns(self, price_data: Dict) -> np.ndarray:
-        """Calculate returns from price data"""
+    def _price_series(self, price_data: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Parse a symbol's price list into (prices, returns) arrays.
+        
+        Price data with a 'cache_key' entry has its arrays memoized under that key, which
+        must change whenever the price list does. The arrays are shared between callers,
+        so they are read-only.
+        """
         prices = price_data.get('prices', [])
-        if len(prices) < 2:
-            return np.array([])
+        if not prices:
+            return np.array([]), np.array([])
+        
+        key = price_data.get('cache_key')
+        if key is not None and key in self._price_cache:
+            self._price_cache.move_to_end(key)
+            return self._price_cache[key]
         
-        prices_array = np.array([p['price'] for p in prices])
+        # Read the prices straight into the array, without an intermediate list
+        prices_array = np.fromiter(map(itemgetter('price'), prices), dtype=np.float64, count=len(prices))
         returns = np.diff(prices_array) / prices_array[:-1]
-        return returns
-    
-    def _calculate_volatility(self, price_data: Dict, window: int = 30) -> float:
-        """Calculate volatility from price data"""
-        returns = self._calculate_returns(price_data)
-        if len(returns) < window:
-            return 0.0
+        prices_array.setflags(write=False)
+        returns.setflags(write=False)
+        
+        if key is not None:
+            self._price_cache[key] = (prices_array, returns)
+            if len(self._price_cache) > self.price_cache_size:
+                self._price_cache.popitem(last=False)
         
-        return np.std(returns[-window:]) * np.sqrt(365)  # Annualized
+        return prices_array, returns
     
-    def _calculate_max_drawdown(self, price_data: Dict) -> float:
-        """Calculate maximum drawdown"""
-        prices = price_data.get('prices', [])
-        if len(prices) < 2:
-            return 0.0
+    def _calculate_returns(self, price_data: Dict) -> np.ndarray:
+        """Calculate returns from price data"""
+        return self._price_series(price_data)[1]
+    
+    def _asset_stats(self, returns: np.ndarray, window: int = 30) -> AssetStats:
+        """Calculate an asset's return statistics from one set of returns"""
+        if len(returns) == 0:
+            return AssetStats(returns, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0)
         
-        prices_array = np.array([p['price'] for p in prices])
-        cumulative = np.cumprod(1 + np.diff(prices_array) / prices_array[:-1])
-        running_max = np.maximum.accumulate(cumulative)
-        drawdown = (cumulative - running_max) / running_max
+        returns_mean = np.mean(returns)
+        returns_std = np.std(returns)
         
-        return abs(np.min(drawdown))
-    
-    def _calculate_beta(self, price_data: Dict, market_data: Dict = None) -> float:
-        """Calculate beta relative to market (simplified)"""
-        # Simplified beta calculation - would need market data in practice
-        returns = self._calculate_returns(price_data)
-        if len(returns) < 30:
-            return 1.0  # Default beta
+        # Annualized volatility over the most recent window
+        volatility = np.std(returns[-window:]) * np.sqrt(365) if len(returns) >= window else 0.0
         
-        # Use volatility as proxy for beta
-        volatility = np.std(returns)
-        market_volatility = 0.02  # Assumed market daily volatility
+        # Simplified beta using volatility as a proxy - would need market data in practice
+        beta = returns_std / MARKET_VOLATILITY if len(returns) >= 30 else 1.0
         
-        return volatility / market_volatility
-    
-    def _calculate_sharpe_ratio(self, price_data: Dict) -> float:
-        """Calculate Sharpe ratio"""
-        returns = self._calculate_returns(price_data)
-        if len(returns) == 0:
-            return 0.0
+        # A flat series has no volatility, drawdown or risk-adjusted return to measure
+        if returns_std < FLAT_RETURNS_STD:
+            return AssetStats(returns, returns_mean, returns_std, 0.0, 0.0, 0.0, beta)
         
-        excess_returns = np.mean(returns) - self.risk_free_rate/365
-        return excess_returns / np.std(returns) if np.std(returns) > 0 else 0.0
+        excess_returns = returns_mean - self.risk_free_rate/365
+        sharpe_ratio = excess_returns / returns_std
+        
+        return AssetStats(
+            returns=returns,
+            mean=returns_mean,
+            std=returns_std,
+            volatility=volatility,
+            max_drawdown=self._calculate_portfolio_max_drawdown(returns),
+            sharpe_ratio=sharpe_ratio,
+            beta=beta
+        )
     
     def _calculate_sortino_ratio(self, returns: np.ndarray) -> float:
         """Calculate Sortino ratio"""
@@ -558,24 +774,25 @@ class RiskAssessmentAgent:
             return 0.0
         
         excess_returns = np.mean(returns) - self.risk_free_rate/365
-        downside_returns = returns[returns < 0]
-        downside_std = np.std(downside_returns) if len(downside_returns) > 0 else np.std(returns)
+        downside_std = _downside_std(returns)
         
-        return excess_returns / downside_std if downside_std > 0 else 0.0
+        return excess_returns / downside_std if downside_std >= FLAT_RETURNS_STD else 0.0
+    
+    def _returns_map(self, portfolio_data: PortfolioView, price_data: Dict) -> Dict[str, np.ndarray]:
+        """Returns of every held symbol, computed once per analysis"""
+        return {symbol: self._calculate_returns(price_data.get(symbol, {})) for symbol in portfolio_data.symbols}
     
-    def _calculate_portfolio_returns(self, portfolio_data: Dict, price_data: Dict) -> np.ndarray:
+    def _calculate_portfolio_returns(self, portfolio_data: PortfolioView, returns_map: Dict[str, np.ndarray]) -> np.ndarray:
         """Calculate portfolio returns"""
         # Simplified portfolio return calculation
         # In practice, would need aligned time series data
         
-        portfolio_returns = []
         min_length = float('inf')
         
         # Get returns for each asset
         asset_returns = {}
-        for asset in portfolio_data['assets']:
-            symbol = asset['symbol']
-            returns = self._calculate_returns(price_data.get(symbol, {}))
+        for symbol in portfolio_data.symbols:
+            returns = returns_map[symbol]
             if len(returns) > 0:
                 asset_returns[symbol] = returns
                 min_length = min(min_length, len(returns))
@@ -583,36 +800,39 @@ class RiskAssessmentAgent:
         if not asset_returns or min_length == 0:
             return np.array([])
         
-        # Calculate weighted portfolio returns
-        for i in range(min_length):
-            portfolio_return = 0
-            for asset in portfolio_data['assets']:
-                symbol = asset['symbol']
-                if symbol in asset_returns:
-                    portfolio_return += asset['weight'] * asset_returns[symbol][-(min_length-i)]
-            portfolio_returns.append(portfolio_return)
+        # Weighted portfolio returns as one product of the weights with the aligned return matrix
+        held = [i for i, symbol in enumerate(portfolio_data.symbols) if symbol in asset_returns]
+        returns_matrix = np.vstack([asset_returns[portfolio_data.symbols[i]][-min_length:] for i in held])
         
-        return np.array(portfolio_returns)
+        return portfolio_data.weights[held] @ returns_matrix
     
     def _calculate_portfolio_max_drawdown(self, returns: np.ndarray) -> float:
         """Calculate portfolio maximum drawdown"""
         if len(returns) == 0:
             return 0.0
         
-        cumulative = np.cumprod(1 + returns)
-        running_max = np.maximum.accumulate(cumulative)
-        drawdown = (cumulative - running_max) / running_max
+        return _max_drawdown(returns)
+    
+    def _rolling_covariance(self, symbols: Tuple[str, ...], returns: np.ndarray) -> np.ndarray:
+        """Covariance of aligned returns, updated from the previous call's window when it only advanced"""
+        key = (symbols, len(returns))
+        rolling = self._cov_cache.get(key)
+        if rolling is None:
+            rolling = self._cov_cache[key] = _RollingCovariance(returns)
+            if len(self._cov_cache) > self.cov_cache_size:
+                self._cov_cache.popitem(last=False)
+        else:
+            self._cov_cache.move_to_end(key)
+            rolling.update(returns)
         
-        return abs(np.min(drawdown))
+        return rolling.covariance()
     
-    def _calculate_portfolio_volatility(self, weights: np.ndarray, correlation_matrix: pd.DataFrame, returns_df: pd.DataFrame) -> float:
+    def _calculate_portfolio_volatility(self, weights: np.ndarray, returns_matrix: np.ndarray) -> float:
         """Calculate portfolio volatility"""
         try:
-            # Calculate covariance matrix
-            cov_matrix = returns_df.cov()
-            
-            # Portfolio variance
-            portfolio_variance = np.dot(weights, np.dot(cov_matrix, weights))
+            # Portfolio variance as the sample variance of the weighted returns, which equals
+            # w' Cov w without forming the covariance and cannot go negative through rounding
+            portfolio_variance = (returns_matrix @ weights).var(ddof=1)
             
             return np.sqrt(portfolio_variance)
         except:
@@ -631,21 +851,24 @@ class RiskAssessmentAgent:
         else:
             return 'very_poor'
     
-    def _find_highly_correlated_pairs(self, correlation_matrix: pd.DataFrame, threshold: float = 0.8) -> List[Dict]:
+    def _find_highly_correlated_pairs(self, correlation_matrix: np.ndarray, symbols: List[str], threshold: float = 0.8) -> List[Dict]:
         """Find highly correlated asset pairs"""
-        pairs = []
+        rows, cols = np.triu_indices(correlation_matrix.shape[0], k=1)
+        correlations = correlation_matrix[rows, cols]
         
-        for i in range(len(correlation_matrix.columns)):
-            for j in range(i+1, len(correlation_matrix.columns)):
-                correlation = correlation_matrix.iloc[i, j]
-                if abs(correlation) >= threshold:
-                    pairs.append({
-                        'asset1': correlation_matrix.columns[i],
-                        'asset2': correlation_matrix.columns[j],
-                        'correlation': correlation
-                    })
+        # Keep pairs above the threshold, strongest first (stable, so ties stay in matrix order)
+        mask = np.abs(correlations) >= threshold
+        rows, cols, correlations = rows[mask], cols[mask], correlations[mask]
+        order = np.argsort(-np.abs(correlations), kind='stable')
         
-        return sorted(pairs, key=lambda x: abs(x['correlation']), reverse=True)
+        return [
+            {
+                'asset1': symbols[rows[k]],
+                'asset2': symbols[cols[k]],
+                'correlation': correlations[k]
+            }
+            for k in order
+        ]
     
     def _get_default_stress_scenarios(self) -> List[Dict]:
         """Get default stress test scenarios"""
@@ -677,38 +900,37 @@ class RiskAssessmentAgent:
             }
         ]
     
-    def _apply_stress_scenario(self, portfolio: Dict, shocks: Dict, price_data: Dict) -> Dict:
+    def _apply_stress_scenario(self, portfolio: PortfolioView, shocks: Dict) -> Dict:
         """Apply stress scenario to portfolio"""
-        new_value = 0
-        asset_impacts = {}
-        
-        for holding in portfolio.get('holdings', []):
-            symbol = holding['symbol']
-            quantity = holding['quantity']
-            current_price = price_data.get(symbol, {}).get('current_price', 0)
-            
-            # Determine shock to apply
-            shock = 0
-            if 'all' in shocks:
-                shock = shocks['all']
-            elif symbol in shocks:
-                shock = shocks[symbol]
-            elif 'others' in shocks:
-                shock = shocks['others']
-            
-            # Apply shock
-            new_price = current_price * (1 + shock)
-            new_asset_value = quantity * new_price
-            new_value += new_asset_value
-            
-            asset_impacts[symbol] = {
-                'original_price': current_price,
+        symbols = portfolio.symbols
+        quantities = portfolio.quantities
+        current_prices = portfolio.prices
+        
+        # Shock per holding: 'all' overrides everything, otherwise the symbol's own shock or 'others'
+        if 'all' in shocks:
+            shock_vec = np.full(len(symbols), shocks['all'], dtype=np.float64)
+        else:
+            default_shock = shocks.get('others', 0)
+            shock_vec = np.array([shocks.get(symbol, default_shock) for symbol in symbols], dtype=np.float64)
+        
+        # Apply shocks
+        new_prices = current_prices * (1 + shock_vec)
+        new_values = quantities * new_prices
+        value_changes = new_values - quantities * current_prices
+        
+        asset_impacts = {
+            symbol: {
+                'original_price': original_price,
                 'new_price': new_price,
                 'shock_applied': shock,
-                'value_change': new_asset_value - (quantity * current_price)
+                'value_change': value_change
             }
+            for symbol, original_price, new_price, shock, value_change in zip(
+                symbols, current_prices.tolist(), new_prices.tolist(), shock_vec.tolist(), value_changes.tolist()
+            )
+        }
         
         return {
-            'new_value': new_value,
+            'new_value': float(new_values.sum()),
             'asset_impacts': asset_impacts
         }
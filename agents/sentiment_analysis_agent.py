@@ -4,21 +4,161 @@ Crypto Sentiment Analysis Agent for XplainCrypto
 Analyzes market sentiment from social media, news, and on-chain data
 """
 
+import asyncio
+import heapq
+import os
+import time
+import multiprocessing
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from operator import attrgetter, itemgetter
 import logging
-import requests
 import re
-from textblob import TextBlob
+import threading
+import aiohttp
+from textblob.en import sentiment as pattern_sentiment
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import tweepy
-import praw
-from newsapi import NewsApiClient
+import asyncpraw
+
+try:
+    # Optional Aho-Corasick automaton for single-pass crypto keyword matching
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
+FEAR_GREED_URL = 'https://api.alternative.me/fng/'
+NEWS_API_URL = 'https://newsapi.org/v2/everything'
+
+# URLs, user mentions and hashtag signs (the hashtag text is kept), stripped in one pass.
+# A mention stops where a URL starts, as if URLs were removed before mentions
+NOISE_PATTERN = re.compile(r'http\S+|www\S+|@(?:(?!http\S|www\S)\w)+|#')
+
+# Averaged sentiment fields, in the column order of the score arrays
+SENTIMENT_FIELDS = ('compound', 'positive', 'negative', 'neutral')
+
+# Text-scoring workers are spawned rather than forked: the agent runs its blocking clients
+# on threads, and forking a threaded process can copy locks held by those threads
+_SPAWN = multiprocessing.get_context('spawn')
+
+
+class _Record:
+    """Base for the slotted per-item records, which are reported as plain dicts"""
+    __slots__ = ()
+    
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+@dataclass(slots=True)
+class TweetRecord(_Record):
+    """A tweet and its sentiment"""
+    id: int
+    text: str
+    created_at: datetime
+    user: str
+    followers: int
+    retweets: int
+    likes: int
+    sentiment: Dict
+
+
+@dataclass(slots=True)
+class RedditPost(_Record):
+    """A Reddit post and its sentiment, scored after the subreddit searches"""
+    id: str
+    title: str
+    text: str
+    subreddit: str
+    score: int
+    upvote_ratio: float
+    num_comments: int
+    created_at: datetime
+    sentiment: Optional[Dict] = None
+
+
+@dataclass(slots=True)
+class NewsArticle(_Record):
+    """A news article and its sentiment, scored after the articles are fetched"""
+    title: str
+    description: Optional[str]
+    source: str
+    url: str
+    published_at: str
+    sentiment: Optional[Dict] = None
+
+
+@dataclass(slots=True)
+class _InfluencerStats:
+    """Running totals of the high-influence tweets seen in a tweet stream"""
+    count: int = 0
+    compound_sum: float = 0.0
+    top: List[TweetRecord] = field(default_factory=list)
+
+
+class _RateLimiter:
+    """Token bucket allowing `rate` calls per `period` seconds across the threads calling an API"""
+    
+    def __init__(self, rate: int, period: float):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Take a token, sleeping the calling thread until it is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.period)
+            self._updated = now
+            # Tokens are reserved in call order, so waiting callers are served first come first served
+            self._tokens -= 1
+            wait = -self._tokens * self.period / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _PacedTwitterAPI(tweepy.API):
+    """Twitter client whose requests wait for a rate limiter rather than running into the API limits"""
+    
+    def __init__(self, auth, limiter: _RateLimiter, **kwargs):
+        super().__init__(auth, **kwargs)
+        self.limiter = limiter
+    
+    def request(self, *args, **kwargs):
+        self.limiter.acquire()
+        return super().request(*args, **kwargs)
+
+
+class _VaderAnalyzer(SentimentIntensityAnalyzer):
+    """
+    VADER analyzer whose negation and idiom checks get only the words they inspect.
+    The stock checks lowercase the whole text for every sentiment-laden word, which
+    makes scoring quadratic in the text length; the scores are unchanged.
+    """
+    
+    @staticmethod
+    def _negation_check(valence, words_and_emoticons, start_i, i):
+        # Looks back start_i + 1 words from the lexicon word at i
+        start = i - (start_i + 1)
+        return SentimentIntensityAnalyzer._negation_check(valence, words_and_emoticons[start:i + 1], start_i, start_i + 1)
+    
+    @staticmethod
+    def _special_idioms_check(valence, words_and_emoticons, i):
+        # Only called with i >= 3 and looks three words back and two ahead
+        return SentimentIntensityAnalyzer._special_idioms_check(valence, words_and_emoticons[i - 3:i + 3], 3)
+
+
 class SentimentAnalysisAgent:
     """
     Advanced sentiment analysis for cryptocurrency markets
@@ -26,7 +166,40 @@ class SentimentAnalysisAgent:
     
     def __init__(self, config: Dict):
         self.config = config
-        self.vader_analyzer = SentimentIntensityAnalyzer()
+        self.vader_analyzer = _VaderAnalyzer()
+        
+        # TextBlob's general-purpose lexicon adds little over VADER and the crypto keywords on
+        # social media text, so it is only scored (and weighted in) when enabled
+        self.use_textblob = config.get('use_textblob', False)
+        
+        # Shared HTTP session for the REST sources, opened by `async with agent`
+        self._session = None
+        self.http_pool_size = config.get('http_pool_size', 50)
+        self.http_pool_size_per_host = config.get('http_pool_size_per_host', 10)
+        
+        # Failed connections to the REST sources are retried with exponential backoff
+        self.http_retries = config.get('http_retries', 3)
+        self.http_backoff = config.get('http_backoff', 0.3)
+        
+        # Event loop thread and HTTP session behind the synchronous methods, started on first
+        # use and kept so that successive calls reuse the pooled keep-alive connections
+        self._sync_loop = None
+        self._sync_session = None
+        self._sync_lock = threading.Lock()
+        
+        # Results of the slow-moving sources are reused for a while: the Fear & Greed Index
+        # updates daily, and news for a symbol is cached per (symbol, days, date)
+        self.fear_greed_ttl = config.get('fear_greed_ttl', 3600)
+        self._fear_greed_cache = {}
+        self.news_cache_ttl = config.get('news_cache_ttl', 900)
+        self.news_cache_size = config.get('news_cache_size', 32)
+        self._news_cache = OrderedDict()
+        
+        # Processes used to score large batches of texts; smaller batches are scored inline
+        # since spawning the pool (a few seconds of imports per worker) outweighs their
+        # scoring work
+        self.text_workers = config.get('text_workers', os.cpu_count() or 1)
+        self.parallel_text_min = config.get('parallel_text_min', 10_000)
         
         # Initialize API clients
         self._init_twitter_client()
@@ -48,6 +221,7 @@ class SentimentAnalysisAgent:
             'bearish': ['dump', 'crash', 'bearish', 'sell', 'panic', 'rekt', 'paper hands'],
             'neutral': ['stable', 'sideways', 'consolidation', 'range', 'support', 'resistance']
         }
+        self._keyword_automaton = self._build_keyword_automaton()
     
     def _init_twitter_client(self):
         """Initialize Twitter API client"""
@@ -61,7 +235,10 @@ class SentimentAnalysisAgent:
                     self.config['twitter_access_token'],
                     self.config['twitter_access_token_secret']
                 )
-                self.twitter_client = tweepy.API(auth, wait_on_rate_limit=True)
+                # Requests are paced by a client-side limiter; tweepy's wait_on_rate_limit would
+                # instead hold a call for up to the 15 minute window once a limit is hit
+                rate, period = self.config.get('twitter_rate_limit', (180, 900))
+                self.twitter_client = _PacedTwitterAPI(auth, _RateLimiter(rate, period))
                 logger.info("Twitter client initialized successfully")
             else:
                 self.twitter_client = None
@@ -72,33 +249,112 @@ class SentimentAnalysisAgent:
     
     def _init_reddit_client(self):
         """Initialize Reddit API client"""
-        try:
-            if all(key in self.config for key in ['reddit_client_id', 'reddit_client_secret']):
-                self.reddit_client = praw.Reddit(
-                    client_id=self.config['reddit_client_id'],
-                    client_secret=self.config['reddit_client_secret'],
-                    user_agent='XplainCrypto Sentiment Analyzer 1.0'
-                )
-                logger.info("Reddit client initialized successfully")
-            else:
-                self.reddit_client = None
-                logger.warning("Reddit API credentials not provided")
-        except Exception as e:
-            logger.error(f"Error initializing Reddit client: {str(e)}")
-            self.reddit_client = None
+        # Async PRAW clients hold an aiohttp session bound to the running event loop,
+        # so a client is opened from these settings for each analysis
+        if all(key in self.config for key in ['reddit_client_id', 'reddit_client_secret']):
+            self.reddit_settings = {
+                'client_id': self.config['reddit_client_id'],
+                'client_secret': self.config['reddit_client_secret'],
+                'user_agent': 'XplainCrypto Sentiment Analyzer 1.0'
+            }
+            logger.info("Reddit client initialized successfully")
+        else:
+            self.reddit_settings = None
+            logger.warning("Reddit API credentials not provided")
     
     def _init_news_client(self):
         """Initialize News API client"""
-        try:
-            if 'news_api_key' in self.config:
-                self.news_client = NewsApiClient(api_key=self.config['news_api_key'])
-                logger.info("News API client initialized successfully")
-            else:
-                self.news_client = None
-                logger.warning("News API key not provided")
-        except Exception as e:
-            logger.error(f"Error initializing News client: {str(e)}")
-            self.news_client = None
+        # News API is queried over its REST endpoint on the shared HTTP session
+        self.news_api_key = self.config.get('news_api_key')
+        if self.news_api_key:
+            logger.info("News API client initialized successfully")
+        else:
+            logger.warning("News API key not provided")
+    
+    def __getstate__(self):
+        """Pickle for the text-scoring workers, which don't need the network clients"""
+        state = self.__dict__.copy()
+        state['twitter_client'] = None
+        state['_session'] = None
+        state['_sync_loop'] = None
+        state['_sync_session'] = None
+        state['_sync_lock'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._sync_lock = threading.Lock()
+    
+    async def __aenter__(self):
+        """Open the HTTP session shared by the REST sources"""
+        self._session = self._create_session()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Close the shared HTTP session"""
+        if self._session:
+            await self._session.close()
+            self._session = None
+    
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Create an HTTP session with a keep-alive connection pool"""
+        return aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=30),
+            connector=aiohttp.TCPConnector(limit=self.http_pool_size, limit_per_host=self.http_pool_size_per_host)
+        )
+    
+    @asynccontextmanager
+    async def _http_session(self, session: Optional[aiohttp.ClientSession] = None):
+        """Use the given or shared HTTP session, or open one for the duration of the block"""
+        if session is None:
+            session = self._session
+        if session is not None:
+            yield session
+        else:
+            async with self._create_session() as session:
+                yield session
+    
+    async def _get_json(self, http: aiohttp.ClientSession, url: str, **kwargs) -> Tuple[int, Optional[Dict]]:
+        """GET a JSON resource, retrying failed connections; the body is None if it isn't JSON"""
+        for attempt in range(self.http_retries + 1):
+            try:
+                async with http.get(url, **kwargs) as response:
+                    try:
+                        return response.status, await response.json(content_type=None)
+                    except ValueError:
+                        return response.status, None
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.http_retries:
+                    raise
+                await asyncio.sleep(self.http_backoff * 2 ** attempt)
+    
+    def _run_sync(self, call):
+        """
+        Run an async call from synchronous code on the agent's event loop thread. The call
+        is given the loop's long-lived HTTP session, which keeps connections alive between calls
+        """
+        with self._sync_lock:
+            if self._sync_loop is None:
+                self._sync_loop = asyncio.new_event_loop()
+                threading.Thread(target=self._sync_loop.run_forever, name='sentiment-agent-loop', daemon=True).start()
+        
+        async def run():
+            if self._sync_session is None:
+                self._sync_session = self._create_session()
+            return await call(self._sync_session)
+        
+        return asyncio.run_coroutine_threadsafe(run(), self._sync_loop).result()
+    
+    def close(self):
+        """Close the HTTP session and stop the event loop thread behind the synchronous methods"""
+        with self._sync_lock:
+            loop, self._sync_loop = self._sync_loop, None
+        if loop is None:
+            return
+        if self._sync_session is not None:
+            asyncio.run_coroutine_threadsafe(self._sync_session.close(), loop).result()
+            self._sync_session = None
+        loop.call_soon_threadsafe(loop.stop)
     
     def analyze_twitter_sentiment(self, symbol: str, count: int = 100) -> Dict:
         """Analyze Twitter sentiment for a cryptocurrency"""
@@ -106,7 +362,8 @@ class SentimentAnalysisAgent:
             if not self.twitter_client:
                 return {'error': 'Twitter client not available'}
             
-            # Search for tweets
+            # Search for tweets, streaming them through in batches so that memory stays bounded
+            # for large counts; each batch is still large enough for the text-scoring processes
             query = f"${symbol} OR {symbol} -filter:retweets"
             tweets = tweepy.Cursor(
                 self.twitter_client.search_tweets,
@@ -115,49 +372,57 @@ class SentimentAnalysisAgent:
                 result_type='recent'
             ).items(count)
             
-            sentiments = []
-            tweet_data = []
-            
-            for tweet in tweets:
+            tweet_count = 0
+            totals = np.zeros(len(SENTIMENT_FIELDS))
+            compounds = []
+            first_tweets = []
+            influencers = _InfluencerStats()
+            while batch := list(islice(tweets, max(1, self.parallel_text_min))):
                 # Clean tweet text
-                text = self._clean_text(tweet.text)
+                texts = [self._clean_text(tweet.text) for tweet in batch]
                 
                 # Analyze sentiment
-                sentiment_scores = self._analyze_text_sentiment(text)
-                sentiments.append(sentiment_scores)
+                sentiments = self._analyze_texts(texts)
+                
+                tweet_data = [
+                    TweetRecord(
+                        id=tweet.id,
+                        text=text,
+                        created_at=tweet.created_at,
+                        user=tweet.user.screen_name,
+                        followers=tweet.user.followers_count,
+                        retweets=tweet.retweet_count,
+                        likes=tweet.favorite_count,
+                        sentiment=sentiment_scores
+                    )
+                    for tweet, text, sentiment_scores in zip(batch, texts, sentiments)
+                ]
                 
-                tweet_data.append({
-                    'id': tweet.id,
-                    'text': text,
-                    'created_at': tweet.created_at,
-                    'user': tweet.user.screen_name,
-                    'followers': tweet.user.followers_count,
-                    'retweets': tweet.retweet_count,
-                    'likes': tweet.favorite_count,
-                    'sentiment': sentiment_scores
-                })
+                # Fold the batch into the running aggregates; only the compounds are kept per tweet
+                scores = self._sentiment_scores(sentiments)
+                tweet_count += len(tweet_data)
+                totals += scores.sum(axis=0, dtype=np.float64)
+                compounds.append(self._compounds(sentiments))
+                first_tweets.extend(tweet_data[:10 - len(first_tweets)])
+                self._update_influencer_stats(influencers, tweet_data)
             
             # Calculate aggregate sentiment
-            if sentiments:
-                avg_sentiment = {
-                    'compound': np.mean([s['compound'] for s in sentiments]),
-                    'positive': np.mean([s['positive'] for s in sentiments]),
-                    'negative': np.mean([s['negative'] for s in sentiments]),
-                    'neutral': np.mean([s['neutral'] for s in sentiments])
-                }
+            if tweet_count:
+                compounds = np.concatenate(compounds)
+                avg_sentiment = dict(zip(SENTIMENT_FIELDS, totals / tweet_count))
                 
-                sentiment_distribution = self._categorize_sentiments(sentiments)
+                sentiment_distribution = self._categorize_sentiments(compounds)
                 
                 return {
                     'platform': 'twitter',
                     'symbol': symbol,
                     'timestamp': datetime.now().isoformat(),
-                    'tweet_count': len(tweet_data),
+                    'tweet_count': tweet_count,
                     'average_sentiment': avg_sentiment,
                     'sentiment_distribution': sentiment_distribution,
-                    'tweets': tweet_data[:10],  # Return top 10 tweets
-                    'sentiment_trend': self._calculate_sentiment_trend(sentiments),
-                    'influencer_sentiment': self._analyze_influencer_sentiment(tweet_data)
+                    'tweets': [tweet.to_dict() for tweet in first_tweets],  # Return top 10 tweets
+                    'sentiment_trend': self._calculate_sentiment_trend(compounds),
+                    'influencer_sentiment': self._analyze_influencer_sentiment(influencers)
                 }
             else:
                 return {
@@ -173,54 +438,48 @@ class SentimentAnalysisAgent:
     def analyze_reddit_sentiment(self, symbol: str, subreddits: List[str] = None) -> Dict:
         """Analyze Reddit sentiment for a cryptocurrency"""
         try:
-            if not self.reddit_client:
+            return self._run_sync(lambda session: self.analyze_reddit_sentiment_async(symbol, subreddits))
+        except Exception as e:
+            logger.error(f"Error analyzing Reddit sentiment: {str(e)}")
+            return {'error': str(e)}
+    
+    async def analyze_reddit_sentiment_async(self, symbol: str, subreddits: List[str] = None) -> Dict:
+        """Analyze Reddit sentiment for a cryptocurrency"""
+        try:
+            if not self.reddit_settings:
                 return {'error': 'Reddit client not available'}
             
             if subreddits is None:
                 subreddits = ['cryptocurrency', 'CryptoMarkets', 'Bitcoin', 'ethereum', 'altcoin']
             
+            # Search all subreddits at once; a failing subreddit is skipped without affecting the others
+            async with asyncpraw.Reddit(**self.reddit_settings) as reddit:
+                subreddit_posts = await asyncio.gather(
+                    *(self._search_subreddit(reddit, subreddit_name, symbol) for subreddit_name in subreddits),
+                    return_exceptions=True
+                )
+            
+            texts = []
             all_posts = []
-            sentiments = []
+            for subreddit_name, result in zip(subreddits, subreddit_posts):
+                if isinstance(result, BaseException):
+                    logger.warning(f"Error processing subreddit {subreddit_name}: {str(result)}")
+                else:
+                    texts.extend(result[0])
+                    all_posts.extend(result[1])
             
-            for subreddit_name in subreddits:
-                try:
-                    subreddit = self.reddit_client.subreddit(subreddit_name)
-                    
-                    # Search for posts mentioning the symbol
-                    for post in subreddit.search(symbol, limit=20):
-                        # Analyze post title and content
-                        text = f"{post.title} {post.selftext}"
-                        text = self._clean_text(text)
-                        
-                        if len(text) > 10:  # Skip very short posts
-                            sentiment_scores = self._analyze_text_sentiment(text)
-                            sentiments.append(sentiment_scores)
-                            
-                            all_posts.append({
-                                'id': post.id,
-                                'title': post.title,
-                                'text': post.selftext[:200],  # First 200 chars
-                                'subreddit': subreddit_name,
-                                'score': post.score,
-                                'upvote_ratio': post.upvote_ratio,
-                                'num_comments': post.num_comments,
-                                'created_at': datetime.fromtimestamp(post.created_utc),
-                                'sentiment': sentiment_scores
-                            })
-                except Exception as e:
-                    logger.warning(f"Error processing subreddit {subreddit_name}: {str(e)}")
-                    continue
+            # Analyze post titles and content in one batch, off the event loop
+            sentiments = await asyncio.to_thread(self._analyze_texts, texts)
+            for post, sentiment_scores in zip(all_posts, sentiments):
+                post.sentiment = sentiment_scores
             
             # Calculate aggregate sentiment
             if sentiments:
-                avg_sentiment = {
-                    'compound': np.mean([s['compound'] for s in sentiments]),
-                    'positive': np.mean([s['positive'] for s in sentiments]),
-                    'negative': np.mean([s['negative'] for s in sentiments]),
-                    'neutral': np.mean([s['neutral'] for s in sentiments])
-                }
+                scores = self._sentiment_scores(sentiments)
+                avg_sentiment = dict(zip(SENTIMENT_FIELDS, scores.mean(axis=0, dtype=np.float64)))
                 
-                sentiment_distribution = self._categorize_sentiments(sentiments)
+                sentiment_distribution = self._categorize_sentiments(self._compounds(sentiments))
+                post_scores = np.fromiter(map(attrgetter('score'), all_posts), dtype=np.int32, count=len(all_posts))
                 
                 return {
                     'platform': 'reddit',
@@ -230,7 +489,7 @@ class SentimentAnalysisAgent:
                     'subreddits_analyzed': subreddits,
                     'average_sentiment': avg_sentiment,
                     'sentiment_distribution': sentiment_distribution,
-                    'top_posts': sorted(all_posts, key=lambda x: x['score'], reverse=True)[:10],
+                    'top_posts': [all_posts[i].to_dict() for i in self._top_indices(post_scores, 10)],
                     'sentiment_by_subreddit': self._analyze_sentiment_by_subreddit(all_posts)
                 }
             else:
@@ -244,59 +503,107 @@ class SentimentAnalysisAgent:
             logger.error(f"Error analyzing Reddit sentiment: {str(e)}")
             return {'error': str(e)}
     
+    async def _search_subreddit(self, reddit: asyncpraw.Reddit, subreddit_name: str, symbol: str) -> Tuple[List[str], List[RedditPost]]:
+        """Search a subreddit for posts mentioning the symbol, returning their cleaned texts and details"""
+        subreddit = await reddit.subreddit(subreddit_name)
+        texts = []
+        posts = []
+        
+        # Search for posts mentioning the symbol
+        async for post in subreddit.search(symbol, limit=20):
+            # Post title and content
+            text = f"{post.title} {post.selftext}"
+            text = self._clean_text(text)
+            
+            if len(text) > 10:  # Skip very short posts
+                texts.append(text)
+                posts.append(RedditPost(
+                    id=post.id,
+                    title=post.title,
+                    text=post.selftext[:200],  # First 200 chars
+                    subreddit=subreddit_name,
+                    score=post.score,
+                    upvote_ratio=post.upvote_ratio,
+                    num_comments=post.num_comments,
+                    created_at=datetime.fromtimestamp(post.created_utc)
+                ))
+        
+        return texts, posts
+    
     def analyze_news_sentiment(self, symbol: str, days: int = 7) -> Dict:
         """Analyze news sentiment for a cryptocurrency"""
         try:
-            if not self.news_client:
+            return self._run_sync(lambda session: self.analyze_news_sentiment_async(symbol, days, session=session))
+        except Exception as e:
+            logger.error(f"Error analyzing news sentiment: {str(e)}")
+            return {'error': str(e)}
+    
+    async def analyze_news_sentiment_async(self, symbol: str, days: int = 7,
+                                           session: Optional[aiohttp.ClientSession] = None) -> Dict:
+        """Analyze news sentiment for a cryptocurrency"""
+        try:
+            if not self.news_api_key:
                 return {'error': 'News API client not available'}
             
             # Calculate date range
             to_date = datetime.now()
             from_date = to_date - timedelta(days=days)
             
+            key = (symbol, days, to_date.strftime('%Y-%m-%d'))
+            cached = self._news_cache.get(key)
+            if cached and time.monotonic() - cached[0] < self.news_cache_ttl:
+                self._news_cache.move_to_end(key)
+                return cached[1]
+            
             # Search for news articles
-            articles = self.news_client.get_everything(
-                q=f"{symbol} cryptocurrency OR {symbol} crypto",
-                from_param=from_date.strftime('%Y-%m-%d'),
-                to=to_date.strftime('%Y-%m-%d'),
-                language='en',
-                sort_by='relevancy',
-                page_size=100
-            )
+            async with self._http_session(session) as http:
+                status, articles = await self._get_json(
+                    http,
+                    NEWS_API_URL,
+                    params={
+                        'q': f"{symbol} cryptocurrency OR {symbol} crypto",
+                        'from': from_date.strftime('%Y-%m-%d'),
+                        'to': to_date.strftime('%Y-%m-%d'),
+                        'language': 'en',
+                        'sortBy': 'relevancy',
+                        'pageSize': 100
+                    },
+                    headers={'Authorization': self.news_api_key}
+                )
+            if status != 200:
+                raise RuntimeError((articles or {}).get('message', f'News API request failed with status {status}'))
             
-            sentiments = []
+            texts = []
             article_data = []
             
             for article in articles['articles']:
-                # Analyze article title and description
+                # Article title and description
                 text = f"{article['title']} {article['description'] or ''}"
                 text = self._clean_text(text)
                 
                 if len(text) > 10:
-                    sentiment_scores = self._analyze_text_sentiment(text)
-                    sentiments.append(sentiment_scores)
-                    
-                    article_data.append({
-                        'title': article['title'],
-                        'description': article['description'],
-                        'source': article['source']['name'],
-                        'url': article['url'],
-                        'published_at': article['publishedAt'],
-                        'sentiment': sentiment_scores
-                    })
+                    texts.append(text)
+                    article_data.append(NewsArticle(
+                        title=article['title'],
+                        description=article['description'],
+                        source=article['source']['name'],
+                        url=article['url'],
+                        published_at=article['publishedAt']
+                    ))
+            
+            # Analyze the articles in one batch, off the event loop
+            sentiments = await asyncio.to_thread(self._analyze_texts, texts)
+            for article, sentiment_scores in zip(article_data, sentiments):
+                article.sentiment = sentiment_scores
             
             # Calculate aggregate sentiment
             if sentiments:
-                avg_sentiment = {
-                    'compound': np.mean([s['compound'] for s in sentiments]),
-                    'positive': np.mean([s['positive'] for s in sentiments]),
-                    'negative': np.mean([s['negative'] for s in sentiments]),
-                    'neutral': np.mean([s['neutral'] for s in sentiments])
-                }
+                scores = self._sentiment_scores(sentiments)
+                avg_sentiment = dict(zip(SENTIMENT_FIELDS, scores.mean(axis=0, dtype=np.float64)))
                 
-                sentiment_distribution = self._categorize_sentiments(sentiments)
+                sentiment_distribution = self._categorize_sentiments(self._compounds(sentiments))
                 
-                return {
+                result = {
                     'platform': 'news',
                     'symbol': symbol,
                     'timestamp': datetime.now().isoformat(),
@@ -304,10 +611,17 @@ class SentimentAnalysisAgent:
                     'date_range': f"{from_date.strftime('%Y-%m-%d')} to {to_date.strftime('%Y-%m-%d')}",
                     'average_sentiment': avg_sentiment,
                     'sentiment_distribution': sentiment_distribution,
-                    'top_articles': sorted(article_data, key=lambda x: abs(x['sentiment']['compound']), reverse=True)[:10],
+                    'top_articles': [article_data[i].to_dict() for i in self._top_indices(np.abs(scores[:, 0]), 10)],
                     'sentiment_by_source': self._analyze_sentiment_by_source(article_data),
                     'daily_sentiment_trend': self._calculate_daily_sentiment_trend(article_data)
                 }
+                
+                self._news_cache[key] = (time.monotonic(), result)
+                self._news_cache.move_to_end(key)
+                if len(self._news_cache) > self.news_cache_size:
+                    self._news_cache.popitem(last=False)
+                
+                return result
             else:
                 return {
                     'platform': 'news',
@@ -319,47 +633,83 @@ class SentimentAnalysisAgent:
             logger.error(f"Error analyzing news sentiment: {str(e)}")
             return {'error': str(e)}
     
-    def get_fear_greed_index(self) -> Dict:
-        """Get Fear & Greed Index from Alternative.me"""
+    def get_fear_greed_index(self, include_history: bool = False) -> Dict:
+        """Get Fear & Greed Index from Alternative.me, with the last 30 days if include_history is set"""
         try:
-            response = requests.get('https://api.alternative.me/fng/', timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                current_data = data['data'][0]
-                
-                return {
-                    'value': int(current_data['value']),
-                    'value_classification': current_data['value_classification'],
-                    'timestamp': current_data['timestamp'],
-                    'time_until_update': current_data.get('time_until_update'),
-                    'historical_data': data['data'][:30]  # Last 30 days
-                }
-            else:
-                return {'error': f'API request failed with status {response.status_code}'}
+            return self._run_sync(lambda session: self.get_fear_greed_index_async(session=session, include_history=include_history))
+        except Exception as e:
+            logger.error(f"Error fetching Fear & Greed Index: {str(e)}")
+            return {'error': str(e)}
+    
+    async def get_fear_greed_index_async(self, session: Optional[aiohttp.ClientSession] = None,
+                                         include_history: bool = False) -> Dict:
+        """Get Fear & Greed Index from Alternative.me, with the last 30 days if include_history is set"""
+        try:
+            cached = self._fear_greed_cache.get(include_history)
+            if cached and time.monotonic() - cached[0] < self.fear_greed_ttl:
+                return cached[1]
+            
+            # The API returns only the latest value unless asked for more days
+            params = {'limit': 30} if include_history else None
+            async with self._http_session(session) as http:
+                status, data = await self._get_json(http, FEAR_GREED_URL, params=params, timeout=aiohttp.ClientTimeout(total=10))
+            if status != 200:
+                return {'error': f'API request failed with status {status}'}
+            
+            current_data = data['data'][0]
+            
+            result = {
+                'value': int(current_data['value']),
+                'value_classification': current_data['value_classification'],
+                'timestamp': current_data['timestamp'],
+                'time_until_update': current_data.get('time_until_update')
+            }
+            if include_history:
+                result['historical_data'] = data['data'][:30]  # Last 30 days
+            
+            self._fear_greed_cache[include_history] = (time.monotonic(), result)
+            return result
                 
         except Exception as e:
             logger.error(f"Error fetching Fear & Greed Index: {str(e)}")
             return {'error': str(e)}
     
+    def _analyze_texts(self, texts: List[str]) -> List[Dict]:
+        """Analyze the sentiment of a batch of texts, sharding large batches across processes"""
+        max_workers = min(self.text_workers, len(texts))
+        if max_workers <= 1 or len(texts) < self.parallel_text_min:
+            return list(map(self._analyze_text_sentiment, texts))
+        
+        # Hand texts out in chunks so the agent and its lexicons are pickled once per chunk, not per text
+        chunksize = max(64, len(texts) // (max_workers * 4))
+        
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=_SPAWN) as executor:
+            return list(executor.map(self._analyze_text_sentiment, texts, chunksize=chunksize))
+    
     def _analyze_text_sentiment(self, text: str) -> Dict:
         """Analyze sentiment of text using multiple methods"""
         # VADER sentiment analysis
         vader_scores = self.vader_analyzer.polarity_scores(text)
         
-        # TextBlob sentiment analysis
-        blob = TextBlob(text)
-        textblob_polarity = blob.sentiment.polarity
-        textblob_subjectivity = blob.sentiment.subjectivity
-        
         # Crypto-specific keyword analysis
         crypto_sentiment = self._analyze_crypto_keywords(text)
         
         # Combine scores (weighted average)
-        combined_compound = (
-            vader_scores['compound'] * 0.5 +
-            textblob_polarity * 0.3 +
-            crypto_sentiment * 0.2
-        )
+        if self.use_textblob:
+            # TextBlob sentiment analysis, scored by its pattern analyzer directly: TextBlob(text).sentiment
+            # gives the same scores after building a blob and a fresh result type for every text
+            textblob_polarity, textblob_subjectivity = pattern_sentiment(text)
+            combined_compound = (
+                vader_scores['compound'] * 0.5 +
+                textblob_polarity * 0.3 +
+                crypto_sentiment * 0.2
+            )
+        else:
+            textblob_polarity = textblob_subjectivity = 0.0
+            combined_compound = (
+                vader_scores['compound'] * 0.7 +
+                crypto_sentiment * 0.3
+            )
         
         return {
             'compound': combined_compound,
@@ -371,13 +721,33 @@ class SentimentAnalysisAgent:
             'crypto_sentiment': crypto_sentiment
         }
     
+    def _build_keyword_automaton(self):
+        """Build an Aho-Corasick automaton over the crypto keywords, or None without pyahocorasick"""
+        if ahocorasick is None:
+            return None
+        
+        automaton = ahocorasick.Automaton()
+        for category, keywords in self.crypto_keywords.items():
+            for keyword in keywords:
+                automaton.add_word(keyword, (category, keyword))
+        automaton.make_automaton()
+        return automaton
+    
     def _analyze_crypto_keywords(self, text: str) -> float:
         """Analyze crypto-specific keywords for sentiment"""
         text_lower = text.lower()
         
-        bullish_count = sum(1 for keyword in self.crypto_keywords['bullish'] if keyword in text_lower)
-        bearish_count = sum(1 for keyword in self.crypto_keywords['bearish'] if keyword in text_lower)
-        neutral_count = sum(1 for keyword in self.crypto_keywords['neutral'] if keyword in text_lower)
+        if self._keyword_automaton is not None:
+            # One scan for all keywords; each keyword counts once however often it appears
+            matched = {match for _, match in self._keyword_automaton.iter(text_lower)}
+            counts = Counter(category for category, _ in matched)
+            bullish_count = counts['bullish']
+            bearish_count = counts['bearish']
+            neutral_count = counts['neutral']
+        else:
+            bullish_count = sum(1 for keyword in self.crypto_keywords['bullish'] if keyword in text_lower)
+            bearish_count = sum(1 for keyword in self.crypto_keywords['bearish'] if keyword in text_lower)
+            neutral_count = sum(1 for keyword in self.crypto_keywords['neutral'] if keyword in text_lower)
         
         total_keywords = bullish_count + bearish_count + neutral_count
         
@@ -393,60 +763,57 @@ class SentimentAnalysisAgent:
         if not text:
             return ""
         
-        # Remove URLs
-        text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
-        
-        # Remove user mentions and hashtags (but keep the text)
-        text = re.sub(r'@\w+|#', '', text)
+        # Remove URLs, user mentions and hashtags (but keep the text)
+        text = NOISE_PATTERN.sub('', text)
         
         # Remove extra whitespace
-        text = ' '.join(text.split())
-        
-        return text.strip()
+        return ' '.join(text.split())
+    
+    def _sentiment_scores(self, sentiments: List[Dict]) -> np.ndarray:
+        """Collect the sentiment fields into an (n, 4) array, one column per field"""
+        # Single precision is ample for scores in [-1, 1]; reductions over them accumulate in double
+        return np.array(list(map(itemgetter(*SENTIMENT_FIELDS), sentiments)), dtype=np.float32)
+    
+    def _compounds(self, sentiments: List[Dict]) -> np.ndarray:
+        """Collect the compound scores in double precision, as bucketed against the exact thresholds"""
+        # In single precision a compound equal to a threshold such as -0.2 rounds below it
+        return np.fromiter(map(itemgetter('compound'), sentiments), dtype=np.float64, count=len(sentiments))
+    
+    def _top_indices(self, values: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k largest values, largest first and ties in their original order"""
+        if len(values) > k:
+            # Partition out the k-th largest value, then rank only the values at or above it
+            kth = np.partition(values, len(values) - k)[len(values) - k]
+            candidates = np.flatnonzero(values >= kth)
+        else:
+            candidates = np.arange(len(values))
+        return candidates[np.argsort(-values[candidates], kind='stable')][:k]
     
-    def _categorize_sentiments(self, sentiments: List[Dict]) -> Dict:
+    def _categorize_sentiments(self, compounds: np.ndarray) -> Dict:
         """Categorize sentiments into buckets"""
-        categories = {
-            'very_positive': 0,
-            'positive': 0,
-            'neutral': 0,
-            'negative': 0,
-            'very_negative': 0
-        }
+        categories = ['very_positive', 'positive', 'neutral', 'negative', 'very_negative']
         
-        for sentiment in sentiments:
-            compound = sentiment['compound']
-            
-            if compound >= self.sentiment_thresholds['very_positive']:
-                categories['very_positive'] += 1
-            elif compound >= self.sentiment_thresholds['positive']:
-                categories['positive'] += 1
-            elif compound >= self.sentiment_thresholds['neutral']:
-                categories['neutral'] += 1
-            elif compound >= self.sentiment_thresholds['negative']:
-                categories['negative'] += 1
-            else:
-                categories['very_negative'] += 1
+        # Descending bucket floors: np.digitize puts a compound >= a floor in that bucket,
+        # and anything below the last floor in very_negative
+        floors = np.array([self.sentiment_thresholds[category] for category in categories[:-1]])
+        counts = np.bincount(np.digitize(compounds, floors), minlength=len(categories))
         
         # Convert to percentages
-        total = len(sentiments)
+        total = len(compounds)
         if total > 0:
-            categories = {k: (v / total) * 100 for k, v in categories.items()}
+            counts = counts / total * 100
         
-        return categories
+        return dict(zip(categories, counts.tolist()))
     
-    def _calculate_sentiment_trend(self, sentiments: List[Dict]) -> str:
+    def _calculate_sentiment_trend(self, compounds: np.ndarray) -> str:
         """Calculate sentiment trend over time"""
-        if len(sentiments) < 10:
+        if len(compounds) < 10:
             return 'insufficient_data'
         
         # Split into first and second half
-        mid_point = len(sentiments) // 2
-        first_half = sentiments[:mid_point]
-        second_half = sentiments[mid_point:]
-        
-        first_avg = np.mean([s['compound'] for s in first_half])
-        second_avg = np.mean([s['compound'] for s in second_half])
+        mid_point = len(compounds) // 2
+        first_avg = compounds[:mid_point].mean(dtype=np.float64)
+        second_avg = compounds[mid_point:].mean(dtype=np.float64)
         
         difference = second_avg - first_avg
         
@@ -457,97 +824,70 @@ class SentimentAnalysisAgent:
         else:
             return 'stable'
     
-    def _analyze_influencer_sentiment(self, tweet_data: List[Dict]) -> Dict:
-        """Analyze sentiment from high-influence accounts"""
+    def _update_influencer_stats(self, stats: _InfluencerStats, tweet_data: List[TweetRecord]):
+        """Add a batch of tweets from high-influence accounts to the running totals"""
         # Define influencer threshold (accounts with >10k followers)
         influencer_threshold = 10000
         
         influencer_tweets = [
             tweet for tweet in tweet_data 
-            if tweet['followers'] >= influencer_threshold
+            if tweet.followers >= influencer_threshold
         ]
         
-        if not influencer_tweets:
+        if influencer_tweets:
+            stats.count += len(influencer_tweets)
+            stats.compound_sum += np.sum([tweet.sentiment['compound'] for tweet in influencer_tweets])
+            # Earlier tweets come first, so ties keep the same order as one pass over the stream
+            stats.top = heapq.nlargest(5, stats.top + influencer_tweets, key=attrgetter('followers'))
+    
+    def _analyze_influencer_sentiment(self, stats: _InfluencerStats) -> Dict:
+        """Analyze sentiment from high-influence accounts"""
+        if not stats.count:
             return {'count': 0, 'average_sentiment': None}
         
-        avg_sentiment = np.mean([tweet['sentiment']['compound'] for tweet in influencer_tweets])
-        
         return {
-            'count': len(influencer_tweets),
-            'average_sentiment': avg_sentiment,
-            'top_influencers': sorted(
-                influencer_tweets, 
-                key=lambda x: x['followers'], 
-                reverse=True
-            )[:5]
+            'count': stats.count,
+            'average_sentiment': stats.compound_sum / stats.count,
+            'top_influencers': [tweet.to_dict() for tweet in stats.top]
         }
     
-    def _analyze_sentiment_by_subreddit(self, posts: List[Dict]) -> Dict:
+    def _sentiment_by(self, items: List, keys: List, count_field: str, with_std: bool = True) -> Dict:
+        """Group the items' compound sentiment by key: mean, count and population std per key, in first-seen order"""
+        # Group on first-seen codes rather than the keys themselves, which pandas would
+        # coerce when missing (a source without a name)
+        labels = {}
+        codes = [labels.setdefault(key, len(labels)) for key in keys]
+        grouped = pd.Series([item.sentiment['compound'] for item in items]).groupby(codes)
+        stats = {'average_sentiment': grouped.mean(), count_field: grouped.size()}
+        if with_std:
+            stats['sentiment_std'] = grouped.std(ddof=0)
+        return dict(zip(labels, pd.DataFrame(stats).to_dict(orient='records')))
+    
+    def _analyze_sentiment_by_subreddit(self, posts: List[RedditPost]) -> Dict:
         """Analyze sentiment breakdown by subreddit"""
-        subreddit_sentiments = {}
-        
-        for post in posts:
-            subreddit = post['subreddit']
-            if subreddit not in subreddit_sentiments:
-                subreddit_sentiments[subreddit] = []
-            subreddit_sentiments[subreddit].append(post['sentiment']['compound'])
-        
-        # Calculate average sentiment per subreddit
-        result = {}
-        for subreddit, sentiments in subreddit_sentiments.items():
-            result[subreddit] = {
-                'average_sentiment': np.mean(sentiments),
-                'post_count': len(sentiments),
-                'sentiment_std': np.std(sentiments)
-            }
-        
-        return result
+        return self._sentiment_by(posts, [post.subreddit for post in posts], 'post_count')
     
-    def _analyze_sentiment_by_source(self, articles: List[Dict]) -> Dict:
+    def _analyze_sentiment_by_source(self, articles: List[NewsArticle]) -> Dict:
         """Analyze sentiment breakdown by news source"""
-        source_sentiments = {}
-        
-        for article in articles:
-            source = article['source']
-            if source not in source_sentiments:
-                source_sentiments[source] = []
-            source_sentiments[source].append(article['sentiment']['compound'])
-        
-        # Calculate average sentiment per source
-        result = {}
-        for source, sentiments in source_sentiments.items():
-            result[source] = {
-                'average_sentiment': np.mean(sentiments),
-                'article_count': len(sentiments),
-                'sentiment_std': np.std(sentiments)
-            }
-        
-        return result
+        return self._sentiment_by(articles, [article.source for article in articles], 'article_count')
     
-    def _calculate_daily_sentiment_trend(self, articles: List[Dict]) -> Dict:
+    def _calculate_daily_sentiment_trend(self, articles: List[NewsArticle]) -> Dict:
         """Calculate daily sentiment trend from articles"""
-        daily_sentiments = {}
-        
-        for article in articles:
-            # Parse date from published_at
-            date_str = article['published_at'][:10]  # YYYY-MM-DD
-            
-            if date_str not in daily_sentiments:
-                daily_sentiments[date_str] = []
-            daily_sentiments[date_str].append(article['sentiment']['compound'])
-        
-        # Calculate daily averages
-        daily_averages = {}
-        for date, sentiments in daily_sentiments.items():
-            daily_averages[date] = {
-                'average_sentiment': np.mean(sentiments),
-                'article_count': len(sentiments)
-            }
-        
-        return daily_averages
+        # Parse date from published_at (YYYY-MM-DD)
+        dates = [article.published_at[:10] for article in articles]
+        return self._sentiment_by(articles, dates, 'article_count', with_std=False)
     
     def get_comprehensive_sentiment(self, symbol: str) -> Dict:
         """Get comprehensive sentiment analysis from all sources"""
+        try:
+            return self._run_sync(lambda session: self.get_comprehensive_sentiment_async(symbol, session=session))
+        except Exception as e:
+            logger.error(f"Error getting comprehensive sentiment: {str(e)}")
+            return {'error': str(e)}
+    
+    async def get_comprehensive_sentiment_async(self, symbol: str,
+                                                session: Optional[aiohttp.ClientSession] = None) -> Dict:
+        """Get comprehensive sentiment analysis from all sources, querying them concurrently"""
         try:
             results = {
                 'symbol': symbol,
@@ -558,25 +898,23 @@ class SentimentAnalysisAgent:
                 'confidence': 0.0
             }
             
-            # Analyze Twitter sentiment
-            twitter_result = self.analyze_twitter_sentiment(symbol)
-            if 'error' not in twitter_result:
-                results['sources']['twitter'] = twitter_result
-            
-            # Analyze Reddit sentiment
-            reddit_result = self.analyze_reddit_sentiment(symbol)
-            if 'error' not in reddit_result:
-                results['sources']['reddit'] = reddit_result
-            
-            # Analyze news sentiment
-            news_result = self.analyze_news_sentiment(symbol)
-            if 'error' not in news_result:
-                results['sources']['news'] = news_result
+            # Twitter, Reddit, news and the Fear & Greed Index are independent network-bound
+            # lookups, so run them side by side: the REST sources on one pooled HTTP session,
+            # the blocking Twitter client on a worker thread
+            async with self._http_session(session) as session:
+                source_results = await asyncio.gather(
+                    asyncio.to_thread(self.analyze_twitter_sentiment, symbol),
+                    self.analyze_reddit_sentiment_async(symbol),
+                    self.analyze_news_sentiment_async(symbol, session=session),
+                    self.get_fear_greed_index_async(session=session, include_history=False),
+                    return_exceptions=True
+                )
             
-            # Get Fear & Greed Index
-            fg_index = self.get_fear_greed_index()
-            if 'error' not in fg_index:
-                results['sources']['fear_greed_index'] = fg_index
+            for source_name, source_result in zip(('twitter', 'reddit', 'news', 'fear_greed_index'), source_results):
+                if isinstance(source_result, BaseException):
+                    logger.warning(f"Error fetching {source_name} sentiment: {str(source_result)}")
+                elif 'error' not in source_result:
+                    results['sources'][source_name] = source_result
             
             # Calculate overall sentiment
             if results['sources']:
@@ -4,17 +4,45 @@ Crypto Whale Tracking Agent for XplainCrypto
 Monitors large transactions and whale wallet activities
 """
 
+import asyncio
+import json
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+from itertools import chain
 import logging
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from web3 import Web3
+import threading
 import time
 
+try:
+    # Optional Redis cache for block and balance lookups, shared across agent processes
+    import redis
+except ImportError:
+    redis = None
+
 logger = logging.getLogger(__name__)
 
+# keccak256('Transfer(address,address,uint256)'), the topic of ERC-20 Transfer events
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+
+# ERC-20 tokens tracked from their Transfer events: contract address, decimals and CoinGecko id
+ERC20_TOKENS = {
+    'USDT': ('0xdAC17F958D2ee523a2206206994597C13D831ec7', 6, 'tether'),
+    'USDC': ('0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48', 6, 'usd-coin'),
+}
+
+# Known exchange addresses (simplified)
+EXCHANGE_ADDRESSES = [
+    '0x742d35cc6634c0532925a3b8d4c9db96c4b4d8b6',  # Example exchange
+    '0x8894e0a0c962cb723c1976a4421c95949be2d4e3',  # Example exchange
+]
+
 class WhaleTrackingAgent:
     """
     Advanced whale tracking and large transaction monitoring
@@ -33,10 +61,45 @@ class WhaleTrackingAgent:
             'DOT': 100000,   # 100K+ DOT
         }
         
+        # Lowercased for exact-match lookups when classifying movements
+        self._exchange_addresses = frozenset(addr.lower() for addr in EXCHANGE_ADDRESSES)
+        
         # Initialize Web3 connections
         self.web3_connections = {}
         self._init_blockchain_connections()
         
+        # Blocks are fetched as JSON-RPC batches of `rpc_batch_size` calls, with up to
+        # `fetch_concurrency` requests in flight; each request holds its slot for a further
+        # `rpc_batch_delay` seconds to stay within the node's rate limits
+        self.rpc_batch_size = config.get('rpc_batch_size', 25)
+        self.rpc_batch_delay = config.get('rpc_batch_delay', 0.1)
+        self.fetch_concurrency = config.get('fetch_concurrency', 8)
+        
+        # Token transfers are read from event logs, one eth_getLogs call per `log_block_span` blocks
+        self.log_block_span = config.get('log_block_span', 50)
+        
+        # USD prices are looked up for every large transaction, so each is reused for `price_ttl` seconds
+        self.price_ttl = config.get('price_ttl', 15)
+        self._price_cache = {}
+        
+        # Scanned blocks and whale balances are cached in Redis when it is configured; blocks
+        # within `block_confirmations` of the head are left out as they may still be reorganized
+        self.block_cache_ttl = config.get('block_cache_ttl', 6 * 3600)
+        self.balance_cache_ttl = config.get('balance_cache_ttl', 30)
+        self.block_confirmations = config.get('block_confirmations', 12)
+        self._init_redis_cache()
+        
+        # Price and address lookups share a keep-alive session, retrying failed or throttled
+        # requests up to `http_retries` times with exponential backoff
+        self.http_retries = config.get('http_retries', 3)
+        self.http_backoff = config.get('http_backoff', 0.3)
+        self.http = self._create_requests_session()
+        
+        # Event loop thread behind the synchronous scans, started on first use, so that they
+        # also work when called from code that is already running an event loop
+        self._sync_loop = None
+        self._sync_lock = threading.Lock()
+        
         # Known whale addresses (examples - replace with real data)
         self.known_whales = {
             'ethereum': [
@@ -70,6 +133,58 @@ class WhaleTrackingAgent:
         except Exception as e:
             logger.error(f"Error initializing blockchain connections: {str(e)}")
     
+    def _create_requests_session(self) -> requests.Session:
+        """Create the pooled HTTP session for the synchronous API lookups"""
+        retry = Retry(
+            total=self.http_retries,
+            backoff_factor=self.http_backoff,
+            status_forcelist=[429, 502, 503, 504],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=retry)
+        
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def _run_sync(self, coro):
+        """Run a coroutine from synchronous code on the agent's event loop thread"""
+        with self._sync_lock:
+            if self._sync_loop is None:
+                self._sync_loop = asyncio.new_event_loop()
+                threading.Thread(target=self._sync_loop.run_forever, name='whale-agent-loop', daemon=True).start()
+        
+        return asyncio.run_coroutine_threadsafe(coro, self._sync_loop).result()
+    
+    def close(self):
+        """Close the pooled HTTP connections and stop the event loop thread behind the synchronous scans"""
+        self.http.close()
+        with self._sync_lock:
+            loop, self._sync_loop = self._sync_loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+    
+    def _init_redis_cache(self):
+        """Initialize the Redis cache connection"""
+        self.redis = None
+        try:
+            if redis is None:
+                return
+            
+            if 'redis_url' in self.config:
+                self.redis = redis.Redis.from_url(self.config['redis_url'])
+            elif 'redis_socket' in self.config:
+                self.redis = redis.Redis(unix_socket_path=self.config['redis_socket'])
+            
+            if self.redis:
+                self.redis.ping()
+                logger.info("Redis cache connection initialized")
+                
+        except Exception as e:
+            logger.warning(f"Redis cache unavailable: {str(e)}")
+            self.redis = None
+    
     def track_large_transactions(self, symbol: str, blockchain: str = 'ethereum', hours: int = 24) -> Dict:
         """Track large transactions for a specific cryptocurrency"""
         try:
@@ -168,6 +283,10 @@ class WhaleTrackingAgent:
     
     def _get_ethereum_large_transactions(self, symbol: str, hours: int) -> List[Dict]:
         """Get large Ethereum transactions"""
+        return self._run_sync(self._get_ethereum_large_transactions_async(symbol, hours))
+    
+    async def _get_ethereum_large_transactions_async(self, symbol: str, hours: int) -> List[Dict]:
+        """Get large Ethereum transactions, fetching the block batches concurrently"""
         transactions = []
         
         try:
@@ -176,91 +295,305 @@ class WhaleTrackingAgent:
             
             web3 = self.web3_connections['ethereum']
             
-            # Get recent blocks
-            latest_block = web3.eth.block_number
-            blocks_to_check = min(hours * 240, 1000)  # Approximate blocks per hour
+            async with self._http_session() as http:
+                # Get recent blocks
+                latest_block = int((await self._rpc_batch(http, 'ethereum', 'eth_blockNumber', [[]]))[0], 16)
+                blocks_to_check = min(hours * 240, 1000)  # Approximate blocks per hour
+                
+                threshold = self.whale_thresholds.get(symbol, 1000000)  # Default threshold
+                
+                # Cached blocks keep the transactions above the lowest whale threshold, so
+                # they serve a scan for any symbol
+                floor = min(threshold, *self.whale_thresholds.values()) if self.redis else threshold
+                
+                block_numbers = range(latest_block - blocks_to_check, latest_block)
+                
+                # Token transfers are found from their Transfer events, without scanning the blocks
+                if symbol in ERC20_TOKENS:
+                    transactions = await self._get_erc20_transfers(http, symbol, block_numbers, threshold)
+                    return sorted(transactions, key=lambda x: x['value_usd'], reverse=True)[:100]
+                
+                scanned = await asyncio.to_thread(self._get_cached_blocks, block_numbers, floor)
+                missing = [block_num for block_num in block_numbers if block_num not in scanned]
+                semaphore = asyncio.Semaphore(self.fetch_concurrency)
+                
+                batches = await asyncio.gather(*(
+                    self._scan_ethereum_blocks(http, semaphore, missing[start:start + self.rpc_batch_size], floor)
+                    for start in range(0, len(missing), self.rpc_batch_size)
+                ))
             
-            threshold = self.whale_thresholds.get(symbol, 1000000)  # Default threshold
+            fetched = dict(chain.from_iterable(batches))
+            await asyncio.to_thread(self._cache_blocks, fetched, floor, latest_block - self.block_confirmations)
+            scanned.update(fetched)
             
-            for block_num in range(latest_block - blocks_to_check, latest_block):
-                try:
-                    block = web3.eth.get_block(block_num, full_transactions=True)
-                    
-                    for tx in block.transactions:
-                        # Analyze transaction value
-                        value_eth = web3.from_wei(tx.value, 'ether')
-                        
-                        if value_eth > threshold:
-                            tx_data = {
-                                'hash': tx.hash.hex(),
-                                'from': tx['from'],
-                                'to': tx.to,
-                                'value_eth': float(value_eth),
-                                'value_usd': float(value_eth) * self._get_eth_price(),
-                                'gas_price': tx.gasPrice,
-                                'block_number': block_num,
-                                'timestamp': datetime.fromtimestamp(block.timestamp).isoformat(),
-                                'type': self._classify_transaction_type(tx)
-                            }
-                            transactions.append(tx_data)
-                            
-                except Exception as e:
-                    logger.warning(f"Error processing block {block_num}: {str(e)}")
+            # The price lookup blocks, so it runs off the event loop shared with other scans
+            eth_price = await asyncio.to_thread(self._get_eth_price)
+            
+            # Results are assembled in block order, as a sequential scan would find them
+            for block_num in block_numbers:
+                if block_num not in scanned:
                     continue
+                
+                block_ts, whale_txs = scanned[block_num]
+                for tx in map(self._decode_rpc_transaction, whale_txs):
+                    value_eth = web3.from_wei(tx['value'], 'ether')
+                    if value_eth <= threshold:
+                        continue
                     
-                # Rate limiting
-                time.sleep(0.1)
+                    tx_data = {
+                        'hash': tx['hash'],
+                        'from': tx['from'],
+                        'to': tx['to'],
+                        'value_eth': float(value_eth),
+                        'value_usd': float(value_eth) * eth_price,
+                        'gas_price': tx['gasPrice'],
+                        'block_number': block_num,
+                        'timestamp': datetime.fromtimestamp(block_ts, timezone.utc).isoformat(),
+                        'ts_unix': block_ts,
+                        'type': self._classify_transaction_type(tx)
+                    }
+                    transactions.append(tx_data)
                 
         except Exception as e:
             logger.error(f"Error getting Ethereum transactions: {str(e)}")
         
         return sorted(transactions, key=lambda x: x['value_usd'], reverse=True)[:100]
     
+    async def _scan_ethereum_blocks(self, http: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                                    block_numbers: List[int], threshold: float) -> List[Tuple[int, Tuple[int, List[Dict]]]]:
+        """Fetch a batch of blocks, returning the number, POSIX time and raw transactions over the threshold of each"""
+        blocks = await self._throttled_rpc_batch(
+            http, semaphore, 'eth_getBlockByNumber', [[hex(block_num), True] for block_num in block_numbers]
+        )
+        
+        results = []
+        for block_num, block in zip(block_numbers, blocks):
+            if block is None:
+                logger.warning(f"Error processing block {block_num}: block not returned")
+                continue
+            
+            # Analyze transaction values, keeping only the fields that are reported
+            whale_txs = [
+                {field: tx.get(field) for field in ('hash', 'from', 'to', 'value', 'gasPrice')}
+                for tx in block['transactions']
+                if Web3.from_wei(int(tx['value'], 16), 'ether') > threshold
+            ]
+            results.append((block_num, (int(block['timestamp'], 16), whale_txs)))
+        
+        return results
+    
+    async def _get_erc20_transfers(self, http: aiohttp.ClientSession, symbol: str,
+                                   block_numbers: range, threshold: float) -> List[Dict]:
+        """Get large transfers of an ERC-20 token from its Transfer event logs"""
+        token_address, decimals, coin_id = ERC20_TOKENS[symbol]
+        semaphore = asyncio.Semaphore(self.fetch_concurrency)
+        
+        # Query the logs in block spans, which keeps each result within the node's limits
+        filters = [
+            [{
+                'fromBlock': hex(start),
+                'toBlock': hex(min(start + self.log_block_span, block_numbers.stop) - 1),
+                'address': token_address,
+                'topics': [TRANSFER_TOPIC]
+            }]
+            for start in range(block_numbers.start, block_numbers.stop, self.log_block_span)
+        ]
+        span_logs = await asyncio.gather(*(
+            self._throttled_rpc_batch(http, semaphore, 'eth_getLogs', filters[start:start + self.rpc_batch_size])
+            for start in range(0, len(filters), self.rpc_batch_size)
+        ))
+        
+        whale_transfers = []
+        for log in chain.from_iterable(filter(None, chain.from_iterable(span_logs))):
+            # ERC-721 transfers share the event signature but index the token id as a fourth topic
+            if log.get('removed') or len(log['topics']) != 3:
+                continue
+            
+            amount = int(log['data'], 16) / 10 ** decimals
+            if amount > threshold:
+                whale_transfers.append((log, amount))
+        
+        # Logs carry no block time, so fetch the headers of the blocks holding whale transfers
+        transfer_blocks = sorted({int(log['blockNumber'], 16) for log, _ in whale_transfers})
+        headers = await asyncio.gather(*(
+            self._throttled_rpc_batch(
+                http, semaphore, 'eth_getBlockByNumber',
+                [[hex(block_num), False] for block_num in transfer_blocks[start:start + self.rpc_batch_size]]
+            )
+            for start in range(0, len(transfer_blocks), self.rpc_batch_size)
+        ))
+        block_times = {
+            block_num: int(header['timestamp'], 16)
+            for block_num, header in zip(transfer_blocks, chain.from_iterable(headers))
+            if header
+        }
+        
+        price = await asyncio.to_thread(self._get_coin_price, coin_id, 1.0)
+        
+        transactions = []
+        for log, amount in whale_transfers:
+            block_num = int(log['blockNumber'], 16)
+            block_ts = block_times.get(block_num)
+            transactions.append({
+                'hash': log['transactionHash'],
+                'from': Web3.to_checksum_address('0x' + log['topics'][1][-40:]),
+                'to': Web3.to_checksum_address('0x' + log['topics'][2][-40:]),
+                'token': symbol,
+                'value_token': amount,
+                'value_usd': amount * price,
+                'block_number': block_num,
+                'timestamp': datetime.fromtimestamp(block_ts, timezone.utc).isoformat() if block_ts is not None else None,
+                'ts_unix': block_ts,
+                'type': 'token_transfer'
+            })
+        
+        return transactions
+    
+    async def _throttled_rpc_batch(self, http: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                                   method: str, params_list: List[list]) -> List:
+        """Make a batch of Ethereum JSON-RPC calls within the concurrency limit; a failed batch gives no results"""
+        async with semaphore:
+            try:
+                return await self._rpc_batch(http, 'ethereum', method, params_list)
+            except Exception as e:
+                logger.warning(f"Error making {method} calls: {str(e)}")
+                return [None] * len(params_list)
+            finally:
+                # Rate limiting
+                await asyncio.sleep(self.rpc_batch_delay)
+    
+    def _get_cached_blocks(self, block_numbers: range, floor: float) -> Dict[int, Tuple[int, List[Dict]]]:
+        """Look up scanned blocks in the Redis cache"""
+        if not self.redis:
+            return {}
+        
+        try:
+            values = self.redis.mget([f'eth:block:{block_num}:{floor:g}' for block_num in block_numbers])
+            return {
+                block_num: tuple(json.loads(value))
+                for block_num, value in zip(block_numbers, values)
+                if value is not None
+            }
+        except Exception as e:
+            logger.warning(f"Error reading cached blocks: {str(e)}")
+            return {}
+    
+    def _cache_blocks(self, blocks: Dict[int, Tuple[int, List[Dict]]], floor: float, last_confirmed: int):
+        """Store scanned blocks in the Redis cache"""
+        if not self.redis:
+            return
+        
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            for block_num, scanned in blocks.items():
+                if block_num <= last_confirmed:
+                    pipeline.setex(f'eth:block:{block_num}:{floor:g}', self.block_cache_ttl, json.dumps(scanned))
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Error caching blocks: {str(e)}")
+    
+    def _http_session(self) -> aiohttp.ClientSession:
+        """Create an HTTP session for one scan, with a connection per concurrent request"""
+        return aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=30),
+            connector=aiohttp.TCPConnector(limit=self.fetch_concurrency)
+        )
+    
+    async def _rpc_batch(self, http: aiohttp.ClientSession, chain: str, method: str, params_list: List[list]) -> List:
+        """Make a batch of JSON-RPC calls in one request, returning results in call order (None for failed calls)"""
+        payload = [
+            {'jsonrpc': '2.0', 'id': call_id, 'method': method, 'params': params}
+            for call_id, params in enumerate(params_list)
+        ]
+        async with http.post(self.config[f'{chain}_rpc_url'], json=payload) as response:
+            response.raise_for_status()
+            replies = await response.json(content_type=None)
+        
+        # Nodes that reject the whole batch answer with a single error object
+        if isinstance(replies, dict):
+            raise RuntimeError(replies.get('error', {}).get('message', 'invalid batch response'))
+        
+        # Replies may come back in any order, so they are matched on their ids
+        results = [None] * len(params_list)
+        for reply in replies:
+            if 'error' in reply:
+                logger.warning(f"{method} call failed: {reply['error'].get('message')}")
+            else:
+                results[reply['id']] = reply.get('result')
+        return results
+    
+    def _decode_rpc_transaction(self, tx: Dict) -> Dict:
+        """Decode the quantities and addresses of a raw JSON-RPC transaction as web3 formats them"""
+        return {
+            'hash': tx['hash'],
+            'from': Web3.to_checksum_address(tx['from']),
+            'to': Web3.to_checksum_address(tx['to']) if tx.get('to') else None,
+            'value': int(tx['value'], 16),
+            'gasPrice': int(tx['gasPrice'], 16) if tx.get('gasPrice') else None
+        }
+    
     def _get_bitcoin_large_transactions(self, symbol: str, hours: int) -> List[Dict]:
         """Get large Bitcoin transactions using external API"""
+        return self._run_sync(self._get_bitcoin_large_transactions_async(symbol, hours))
+    
+    async def _get_bitcoin_large_transactions_async(self, symbol: str, hours: int) -> List[Dict]:
+        """Get large Bitcoin transactions using external API, fetching the blocks concurrently"""
         transactions = []
         
         try:
-            # Use blockchain.info API or similar
-            api_url = "https://blockchain.info/blocks?format=json"
-            response = requests.get(api_url, timeout=10)
+            async with self._http_session() as http:
+                # Use blockchain.info API or similar
+                api_url = "https://blockchain.info/blocks?format=json"
+                async with http.get(api_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    if response.status != 200:
+                        return transactions
+                    blocks = (await response.json(content_type=None))['blocks']
+                
+                # Get the details of the recent blocks
+                semaphore = asyncio.Semaphore(self.fetch_concurrency)
+                block_txs = await asyncio.gather(*(
+                    self._fetch_bitcoin_block(http, semaphore, block['hash']) for block in blocks[:10]
+                ))
             
-            if response.status_code == 200:
-                blocks = response.json()['blocks']
-                threshold = self.whale_thresholds.get('BTC', 100)
+            threshold = self.whale_thresholds.get('BTC', 100)
+            btc_price = await asyncio.to_thread(self._get_btc_price)
+            
+            for tx in chain.from_iterable(block_txs):
+                total_output = sum(out['value'] for out in tx['out']) / 100000000  # Convert to BTC
                 
-                for block in blocks[:10]:  # Check recent blocks
-                    block_hash = block['hash']
-                    
-                    # Get block details
-                    block_url = f"https://blockchain.info/rawblock/{block_hash}"
-                    block_response = requests.get(block_url, timeout=10)
-                    
-                    if block_response.status_code == 200:
-                        block_data = block_response.json()
-                        
-                        for tx in block_data['tx']:
-                            total_output = sum(out['value'] for out in tx['out']) / 100000000  # Convert to BTC
-                            
-                            if total_output > threshold:
-                                tx_data = {
-                                    'hash': tx['hash'],
-                                    'value_btc': total_output,
-                                    'value_usd': total_output * self._get_btc_price(),
-                                    'inputs': len(tx['inputs']),
-                                    'outputs': len(tx['out']),
-                                    'timestamp': datetime.fromtimestamp(tx['time']).isoformat(),
-                                    'type': 'bitcoin_transfer'
-                                }
-                                transactions.append(tx_data)
-                    
-                    time.sleep(0.5)  # Rate limiting
+                if total_output > threshold:
+                    tx_data = {
+                        'hash': tx['hash'],
+                        'value_btc': total_output,
+                        'value_usd': total_output * btc_price,
+                        'inputs': len(tx['inputs']),
+                        'outputs': len(tx['out']),
+                        'timestamp': datetime.fromtimestamp(tx['time'], timezone.utc).isoformat(),
+                        'ts_unix': tx['time'],
+                        'type': 'bitcoin_transfer'
+                    }
+                    transactions.append(tx_data)
                     
         except Exception as e:
             logger.error(f"Error getting Bitcoin transactions: {str(e)}")
         
         return sorted(transactions, key=lambda x: x['value_usd'], reverse=True)[:50]
     
+    async def _fetch_bitcoin_block(self, http: aiohttp.ClientSession, semaphore: asyncio.Semaphore, block_hash: str) -> List[Dict]:
+        """Fetch the transactions of a Bitcoin block, or none if it can't be fetched"""
+        async with semaphore:
+            try:
+                block_url = f"https://blockchain.info/rawblock/{block_hash}"
+                async with http.get(block_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    if response.status != 200:
+                        return []
+                    return (await response.json(content_type=None))['tx']
+            except Exception as e:
+                logger.warning(f"Error fetching Bitcoin block {block_hash}: {str(e)}")
+                return []
+            finally:
+                await asyncio.sleep(0.5)  # Rate limiting
+    
     def _get_bsc_large_transactions(self, symbol: str, hours: int) -> List[Dict]:
         """Get large BSC transactions"""
         # Similar to Ethereum but for BSC
@@ -287,7 +620,7 @@ class WhaleTrackingAgent:
                 web3 = self.web3_connections['ethereum']
                 
                 # Get balance
-                balance_wei = web3.eth.get_balance(address)
+                balance_wei = self._get_eth_balance(web3, address)
                 balance_eth = web3.from_wei(balance_wei, 'ether')
                 
                 # Get recent transactions
@@ -311,11 +644,32 @@ class WhaleTrackingAgent:
             logger.error(f"Error analyzing whale address {address}: {str(e)}")
             return None
     
+    def _get_eth_balance(self, web3: Web3, address: str) -> int:
+        """Get the balance of an address in wei, cached in Redis for `balance_cache_ttl` seconds"""
+        key = f'eth:balance:{address.lower()}'
+        if self.redis:
+            try:
+                cached = self.redis.get(key)
+                if cached is not None:
+                    return int(cached)
+            except Exception as e:
+                logger.warning(f"Error reading cached balance: {str(e)}")
+        
+        balance_wei = web3.eth.get_balance(address)
+        
+        if self.redis:
+            try:
+                self.redis.setex(key, self.balance_cache_ttl, str(balance_wei))
+            except Exception as e:
+                logger.warning(f"Error caching balance: {str(e)}")
+        
+        return balance_wei
+    
     def _analyze_bitcoin_address(self, address: str) -> Dict:
         """Analyze Bitcoin address using external API"""
         try:
             api_url = f"https://blockchain.info/rawaddr/{address}"
-            response = requests.get(api_url, timeout=10)
+            response = self.http.get(api_url, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -326,7 +680,8 @@ class WhaleTrackingAgent:
                 for tx in data['txs'][:10]:
                     tx_data = {
                         'hash': tx['hash'],
-                        'timestamp': datetime.fromtimestamp(tx['time']).isoformat(),
+                        'timestamp': datetime.fromtimestamp(tx['time'], timezone.utc).isoformat(),
+                        'ts_unix': tx['time'],
                         'value': sum(out['value'] for out in tx['out'] if out.get('addr') == address) / 100000000
                     }
                     recent_txs.append(tx_data)
@@ -338,7 +693,7 @@ class WhaleTrackingAgent:
                     'balance_usd': balance_btc * self._get_btc_price(),
                     'transaction_count': data['n_tx'],
                     'recent_transactions': recent_txs,
-                    'first_seen': datetime.fromtimestamp(data['txs'][-1]['time']).isoformat() if data['txs'] else None
+                    'first_seen': datetime.fromtimestamp(data['txs'][-1]['time'], timezone.utc).isoformat() if data['txs'] else None
                 }
                 
         except Exception as e:
@@ -387,11 +742,11 @@ class WhaleTrackingAgent:
         
         return movements
     
-    def _classify_transaction_type(self, tx) -> str:
+    def _classify_transaction_type(self, tx: Dict) -> str:
         """Classify transaction type"""
-        if tx.to is None:
+        if tx['to'] is None:
             return 'contract_creation'
-        elif tx.value == 0:
+        elif tx['value'] == 0:
             return 'contract_interaction'
         else:
             return 'transfer'
@@ -401,14 +756,8 @@ class WhaleTrackingAgent:
         from_addr = tx.get('from_address', '').lower()
         to_addr = tx.get('to_address', '').lower()
         
-        # Known exchange addresses (simplified)
-        exchange_addresses = [
-            '0x742d35cc6634c0532925a3b8d4c9db96c4b4d8b6',  # Example exchange
-            '0x8894e0a0c962cb723c1976a4421c95949be2d4e3',  # Example exchange
-        ]
-        
-        from_exchange = any(addr in from_addr for addr in exchange_addresses)
-        to_exchange = any(addr in to_addr for addr in exchange_addresses)
+        from_exchange = from_addr in self._exchange_addresses
+        to_exchange = to_addr in self._exchange_addresses
         
         if from_exchange and not to_exchange:
             return 'exchange_outflow'
@@ -440,43 +789,52 @@ class WhaleTrackingAgent:
         if not transactions:
             return {}
         
-        total_volume = sum(tx.get('value_usd', 0) for tx in transactions)
+        df = pd.DataFrame(transactions)
+        values_usd = self._column(df, 'value_usd', 0)
+        
+        total_volume = values_usd.sum()
         avg_transaction_size = total_volume / len(transactions)
         
-        # Analyze transaction types
-        type_counts = {}
-        for tx in transactions:
-            tx_type = tx.get('type', 'unknown')
-            type_counts[tx_type] = type_counts.get(tx_type, 0) + 1
+        # Analyze transaction types, in order of first appearance
+        type_counts = self._column(df, 'type', 'unknown').value_counts(sort=False).to_dict()
         
         # Analyze time distribution
-        timestamps = [tx.get('timestamp') for tx in transactions if tx.get('timestamp')]
+        timestamps = df['ts_unix'].dropna().astype('int64') if 'ts_unix' in df else pd.Series(dtype='int64')
         time_analysis = self._analyze_time_distribution(timestamps)
         
         return {
             'total_transactions': len(transactions),
-            'total_volume_usd': total_volume,
-            'average_transaction_size_usd': avg_transaction_size,
-            'largest_transaction_usd': max(tx.get('value_usd', 0) for tx in transactions),
+            'total_volume_usd': float(total_volume),
+            'average_transaction_size_usd': float(avg_transaction_size),
+            'largest_transaction_usd': float(values_usd.max()),
             'transaction_types': type_counts,
             'time_analysis': time_analysis
         }
     
+    def _column(self, df: pd.DataFrame, name: str, default) -> pd.Series:
+        """A field of the records in `df`, with `default` for the records that don't have it"""
+        column = df[name] if name in df else pd.Series(None, index=df.index, dtype=object)
+        return column.fillna(default)
+    
     def _summarize_whale_activities(self, activities: List[Dict]) -> Dict:
         """Summarize whale wallet activities"""
         if not activities:
             return {}
         
-        total_balance_usd = sum(activity.get('balance_usd', 0) for activity in activities)
-        active_whales = sum(1 for activity in activities if activity.get('activity_score', 0) > 0.5)
+        df = pd.DataFrame(activities)
+        balances_usd = self._column(df, 'balance_usd', 0).astype(float)
+        activity_scores = self._column(df, 'activity_score', 0).astype(float)
+        
+        total_balance_usd = float(balances_usd.sum())
         
         return {
             'total_whales_monitored': len(activities),
-            'active_whales': active_whales,
+            'active_whales': int((activity_scores > 0.5).sum()),
             'total_balance_usd': total_balance_usd,
             'average_balance_usd': total_balance_usd / len(activities),
-            'most_active_whale': max(activities, key=lambda x: x.get('activity_score', 0), default={}),
-            'largest_whale': max(activities, key=lambda x: x.get('balance_usd', 0), default={})
+            # idxmax picks the first of equal maxima, as max() does
+            'most_active_whale': activities[activity_scores.idxmax()],
+            'largest_whale': activities[balances_usd.idxmax()]
         }
     
     def _generate_movement_alerts(self, movements: List[Dict]) -> List[Dict]:
@@ -521,7 +879,8 @@ class WhaleTrackingAgent:
             return 0.0
         
         # Score based on transaction frequency and recency
-        recent_txs = len([tx for tx in transactions if self._is_recent(tx.get('timestamp'))])
+        cutoff = time.time() - 24 * 3600
+        recent_txs = sum(1 for tx in transactions if self._is_recent(tx.get('ts_unix'), cutoff))
         total_txs = len(transactions)
         
         frequency_score = min(1.0, recent_txs / 10)  # Normalize to 0-1
@@ -529,46 +888,26 @@ class WhaleTrackingAgent:
         
         return (frequency_score + recency_score) / 2
     
-    def _is_recent(self, timestamp_str: str, hours: int = 24) -> bool:
-        """Check if timestamp is within recent hours"""
-        try:
-            timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-            cutoff = datetime.now() - timedelta(hours=hours)
-            return timestamp > cutoff
-        except:
-            return False
+    def _is_recent(self, ts_unix: Optional[int], cutoff: float) -> bool:
+        """Check if a POSIX timestamp is after the cutoff"""
+        return ts_unix is not None and ts_unix > cutoff
     
-    def _analyze_time_distribution(self, timestamps: List[str]) -> Dict:
-        """Analyze time distribution of transactions"""
-        if not timestamps:
+    def _analyze_time_distribution(self, timestamps: pd.Series) -> Dict:
+        """Analyze time distribution of transactions from their POSIX timestamps"""
+        if timestamps.empty:
             return {}
         
         try:
-            # Convert timestamps to datetime objects
-            datetimes = []
-            for ts in timestamps:
-                try:
-                    dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-                    datetimes.append(dt)
-                except:
-                    continue
-            
-            if not datetimes:
-                return {}
-            
-            # Analyze by hour
-            hour_counts = {}
-            for dt in datetimes:
-                hour = dt.hour
-                hour_counts[hour] = hour_counts.get(hour, 0) + 1
+            # Analyze by UTC hour, the zone of the transaction timestamps, in order of first appearance
+            hour_counts = (timestamps // 3600 % 24).value_counts(sort=False)
             
             # Find peak activity hours
-            peak_hour = max(hour_counts.keys(), key=lambda h: hour_counts[h])
+            peak_hour = int(hour_counts.idxmax())
             
             return {
                 'peak_activity_hour': peak_hour,
-                'hourly_distribution': hour_counts,
-                'total_timespan_hours': (max(datetimes) - min(datetimes)).total_seconds() / 3600
+                'hourly_distribution': hour_counts.to_dict(),
+                'total_timespan_hours': int(timestamps.max() - timestamps.min()) / 3600
             }
             
         except Exception as e:
@@ -577,20 +916,27 @@ class WhaleTrackingAgent:
     
     def _get_eth_price(self) -> float:
         """Get current ETH price in USD"""
-        try:
-            response = requests.get('https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies=usd', timeout=5)
-            if response.status_code == 200:
-                return response.json()['ethereum']['usd']
-        except:
-            pass
-        return 2000.0  # Fallback price
+        return self._get_coin_price('ethereum', 2000.0)  # Fallback price
     
     def _get_btc_price(self) -> float:
         """Get current BTC price in USD"""
+        return self._get_coin_price('bitcoin', 50000.0)  # Fallback price
+    
+    def _get_coin_price(self, coin_id: str, fallback: float) -> float:
+        """Get the current USD price of a coin from CoinGecko, cached for `price_ttl` seconds"""
+        cached = self._price_cache.get(coin_id)
+        if cached and time.monotonic() - cached[0] < self.price_ttl:
+            return cached[1]
+        
+        # A failed lookup caches the fallback too, so an unreachable API costs one timeout
+        # per TTL rather than one per transaction
+        price = fallback
         try:
-            response = requests.get('https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd', timeout=5)
+            response = self.http.get(f'https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd', timeout=5)
             if response.status_code == 200:
-                return response.json()['bitcoin']['usd']
+                price = response.json()[coin_id]['usd']
         except:
             pass
-        return 50000.0  # Fallback price
+        
+        self._price_cache[coin_id] = (time.monotonic(), price)
+        return price